@@ -10,6 +10,8 @@ function App() {
   const [downloadLink, setDownloadLink] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState("");
+  const [progress, setProgress] = useState(null);
+  const [previewAnswers, setPreviewAnswers] = useState({});
 
   // Animation configurations
   const fadeIn = useSpring({
@@ -64,8 +66,65 @@ function App() {
 
   const handleOutputFormatChange = (e) => {
     setOutputFormat(e.target.value);
+    // Finished jobs render any format on demand, so just point the link at the new one
+    setDownloadLink((link) => link && link.replace(/\.[a-z]+$/, `.${e.target.value}`));
   };
 
+  const waitForJob = async (statusUrl) => {
+    while (true) {
+      const { data: job } = await axios.get(`${API_BASE_URL}${statusUrl}`);
+      setProgress(job.progress);
+      if (job.status === "done") {
+        return job;
+      }
+      if (job.status === "failed") {
+        throw new Error(job.error || "File processing failed");
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
+  // Streams each batch's answers as it completes, resolving with the download link
+  const streamJob = (jobId) =>
+    new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+      let total = 0;
+      let done = 0;
+
+      source.addEventListener("plan", (event) => {
+        total = JSON.parse(event.data).batches;
+        setProgress({ done, total });
+      });
+      source.addEventListener("batch", (event) => {
+        const batch = JSON.parse(event.data);
+        done += 1;
+        setProgress({ done, total });
+        // positions[i] lists every question (0-based) that shares answers[i]
+        setPreviewAnswers((answers) => {
+          const next = { ...answers };
+          batch.positions.forEach((group, i) =>
+            group.forEach((position) => {
+              next[position] = batch.answers[i];
+            })
+          );
+          return next;
+        });
+      });
+      source.addEventListener("complete", (event) => {
+        source.close();
+        resolve(JSON.parse(event.data).download_link);
+      });
+      source.addEventListener("failed", (event) => {
+        source.close();
+        reject(new Error(JSON.parse(event.data).error || "File processing failed"));
+      });
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          reject(new Error("stream closed"));
+        }
+      };
+    });
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     
@@ -76,6 +135,9 @@ function App() {
 
     setIsLoading(true);
     setError("");
+    setDownloadLink("");
+    setProgress(null);
+    setPreviewAnswers({});
     
     const formData = new FormData();
     formData.append("file", file);
@@ -88,13 +150,25 @@ function App() {
           "Content-Type": "multipart/form-data",
         },
       });
-      setDownloadLink(`${API_BASE_URL}${response.data.download_link}`);
+      let link;
+      try {
+        link = await streamJob(response.data.job_id);
+      } catch (streamError) {
+        if (streamError.message !== "stream closed") {
+          throw streamError;
+        }
+        // Fall back to polling when the event stream can't be kept open
+        link = (await waitForJob(response.data.status_url)).download_link;
+      }
+      setDownloadLink(`${API_BASE_URL}${link}`);
     } catch (error) {
       let errorMessage = "An error occurred";
       if (error.response) {
         errorMessage = error.response.data?.error || error.response.statusText;
       } else if (error.request) {
         errorMessage = "No response from server. Please try again later.";
+      } else if (error.message) {
+        errorMessage = error.message;
       }
       setError(errorMessage);
       console.error("Error:", errorMessage, error);
@@ -159,13 +233,28 @@ function App() {
           {isLoading ? (
             <>
               <span className="spinner"></span>
-              Processing...
+              {progress && progress.total
+                ? `Processing... ${progress.done}/${progress.total}`
+                : "Processing..."}
             </>
           ) : (
             "Process File"
           )}
         </button>
       </animated.form>
+
+      {Object.keys(previewAnswers).length > 0 && (
+        <ol className="answers-preview">
+          {Object.keys(previewAnswers)
+            .map(Number)
+            .sort((a, b) => a - b)
+            .map((position) => (
+              <li key={position} value={position + 1}>
+                {previewAnswers[position]}
+              </li>
+            ))}
+        </ol>
+      )}
       
       {downloadLink && (
         <animated.a 
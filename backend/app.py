@@ -1,34 +1,219 @@
 import os
 import traceback
-import PyPDF2
-from flask import Flask, request, jsonify, send_file, send_from_directory
+import hashlib
+import hmac
+import io
+import tempfile
+from flask import Flask, Request, Response, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
-from docx import Document
-import openpyxl
-import requests
 from dotenv import load_dotenv
+import json
+import uuid
 import time  # Added for retries
-
-# PDF library fallback
-try:
-    from fpdf import FPDF
-except ImportError:
-    from fpdf2 import FPDF as FPDF
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import llm_client
+from cache import TieredCache, answer_key, fingerprint
+from retrieval import iter_chunk_spans, search_chunks, span_text
+import batching
+from extraction import iter_docx_paragraphs, iter_pdf_pages
+from jobs import JobStore, JobQueue, QueueFull, process_alive
+from results import ResultStore
+from ratelimit import SharedRateLimiter
+from resilience import CircuitBreaker, CircuitOpen, UpstreamGuard
+from metrics import MEMORY_BUCKETS, MetricsRegistry, PeakRssSampler
+from profiling import PROFILE_FILES, RequestProfiler
+from segmenter import split_questions, strip_numbering
+from textspool import TextSpool
+import dedupe
+from reuse import ReuseIndex
+import renderers
+from replies import read_answers
+
+class HashingSpooledFile(tempfile.SpooledTemporaryFile):
+    # Hashes the upload as werkzeug streams it in, so the content hash costs no extra pass
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return super().write(data)
+
+class SpooledRequest(Request):
+    # Uploads stay in memory up to UPLOAD_SPOOL_THRESHOLD and only spill to a temp file above it
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpooledFile(max_size=app.config['UPLOAD_SPOOL_THRESHOLD'], mode="w+b")
+
+def upload_fingerprint(upload):
+    if isinstance(upload, HashingSpooledFile):
+        return upload.sha256.hexdigest()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: upload.read(1024 * 1024), b""):
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
 
 app = Flask(__name__, static_folder="../Frontend/dist", static_url_path="")
+app.request_class = SpooledRequest
 # Allow only your Render frontend
-CORS(app, resources={r"/process": {"origins": "https://query-master-1.onrender.com"}})
+CORS(app, resources={
+    r"/process": {"origins": "https://query-master-1.onrender.com"},
+    r"/jobs/*": {"origins": "https://query-master-1.onrender.com"},
+})
 
 # Configuration
 load_dotenv()
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB file limit
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['UPLOAD_SPOOL_THRESHOLD'] = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", 16 * 1024 * 1024))  # Bytes
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'docx', 'txt'}
+app.config['OUTPUT_FORMATS'] = {'txt', 'docx', 'xlsx', 'pdf'}
+app.config['OUTPUT_FORMAT_ALIASES'] = {'xls': 'xlsx'}  # The React form still offers "xls"
+app.config['RESULT_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'results')
+app.config['RESULT_TTL'] = int(os.getenv("RESULT_TTL", 24 * 3600))  # Seconds before a job's outputs are deleted
+app.config['RESULT_QUOTA_BYTES'] = int(os.getenv("RESULT_QUOTA_BYTES", 500 * 1024 * 1024))
+app.config['RESULT_SWEEP_INTERVAL'] = int(os.getenv("RESULT_SWEEP_INTERVAL", 300))  # Seconds
+app.config['PDF_EXTRACT_WORKERS'] = int(os.getenv("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+app.config['PDF_PARALLEL_THRESHOLD'] = int(os.getenv("PDF_PARALLEL_THRESHOLD", 2 * 1024 * 1024))  # Bytes
+app.config['JOB_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'jobs')
+app.config['JOB_WORKERS'] = int(os.getenv("JOB_WORKERS", 2))  # Background jobs per gunicorn worker
+app.config['JOB_QUEUE_LIMIT'] = int(os.getenv("JOB_QUEUE_LIMIT", 20))  # Reject uploads beyond this backlog
+app.config['JOB_AUTO_RESUME'] = os.getenv("JOB_AUTO_RESUME", "true").lower() in ("1", "true", "yes")  # Restart jobs of dead workers
+app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv("JOB_MAX_ATTEMPTS", 3))  # Runs of one job before auto-resume gives up
+app.config['EVENT_POLL_INTERVAL'] = float(os.getenv("EVENT_POLL_INTERVAL", 0.5))  # Seconds between SSE log reads
+app.config['EVENT_HEARTBEAT'] = float(os.getenv("EVENT_HEARTBEAT", 15))  # Keeps proxies from closing idle streams
+app.config['EVENT_STREAM_MAX'] = float(os.getenv("EVENT_STREAM_MAX", 25))  # Seconds a stream holds a request thread before the client reconnects
+app.config['ANSWER_CONCURRENCY'] = int(os.getenv("ANSWER_CONCURRENCY", 4))  # Batches in flight per job
+app.config['LLM_API_URL'] = os.getenv("LLM_API_URL", llm_client.DEFAULT_API_URL)
+app.config['LLM_POOL_SIZE'] = int(os.getenv("LLM_POOL_SIZE", 2 * app.config['JOB_WORKERS'] * app.config['ANSWER_CONCURRENCY']))  # Room for hedges
+app.config['LLM_CONNECT_TIMEOUT'] = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+app.config['LLM_READ_TIMEOUT'] = float(os.getenv("LLM_READ_TIMEOUT", 30))
+app.config['LLM_RATE_LIMIT'] = float(os.getenv("LLM_RATE_LIMIT", 5))  # Upstream requests/second across all workers; 0 = no limiter
+app.config['LLM_RATE_BURST'] = int(os.getenv("LLM_RATE_BURST", 10))
+app.config['LLM_MAX_CONCURRENCY'] = int(os.getenv("LLM_MAX_CONCURRENCY", 16))  # Ceiling of the adaptive in-flight window
+app.config['LLM_BACKOFF'] = float(os.getenv("LLM_BACKOFF", 2))  # Seconds to pause after a 429/5xx without Retry-After
+app.config['LLM_HEDGE_PERCENTILE'] = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))  # Duplicate calls slower than this; 0 = never
+app.config['LLM_HEDGE_MIN_SAMPLES'] = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))  # Latencies seen before hedging starts
+app.config['BREAKER_ERROR_RATE'] = float(os.getenv("BREAKER_ERROR_RATE", 0.5))  # Share of recent calls failing that opens the circuit
+app.config['BREAKER_WINDOW'] = int(os.getenv("BREAKER_WINDOW", 20))  # Recent calls considered
+app.config['BREAKER_MIN_CALLS'] = int(os.getenv("BREAKER_MIN_CALLS", 10))
+app.config['BREAKER_COOLDOWN'] = float(os.getenv("BREAKER_COOLDOWN", 30))  # Seconds open before a trial call
+app.config['RETRIEVAL_CHUNK_WORDS'] = int(os.getenv("RETRIEVAL_CHUNK_WORDS", 200))
+app.config['RETRIEVAL_TOP_K'] = int(os.getenv("RETRIEVAL_TOP_K", 3))  # Chunks attached per question
+app.config['RETRIEVAL_MAX_CHUNKS'] = int(os.getenv("RETRIEVAL_MAX_CHUNKS", 8))  # Chunks attached per batch
+app.config['MODEL_CONTEXT_TOKENS'] = int(os.getenv("MODEL_CONTEXT_TOKENS", 128000))  # gpt-4o-mini window
+app.config['MODEL_MAX_OUTPUT_TOKENS'] = int(os.getenv("MODEL_MAX_OUTPUT_TOKENS", 1000))  # max_tokens per request
+app.config['BATCH_MAX_QUESTIONS'] = int(os.getenv("BATCH_MAX_QUESTIONS", 40))
+app.config['SHORT_ANSWER_TOKENS'] = int(os.getenv("SHORT_ANSWER_TOKENS", 60))  # Expected answer sizes used for packing
+app.config['LONG_ANSWER_TOKENS'] = int(os.getenv("LONG_ANSWER_TOKENS", 250))
+app.config['STRUCTURED_ANSWERS'] = os.getenv("STRUCTURED_ANSWERS", "true").lower() in ("1", "true", "yes")  # JSON replies keyed by question id
+app.config['DEDUP_THRESHOLD'] = float(os.getenv("DEDUP_THRESHOLD", 0.9))  # Near-duplicate similarity; 1 = exact repeats only
+app.config['REUSE_ENABLED'] = os.getenv("REUSE_ENABLED", "false").lower() in ("1", "true", "yes")  # Cross-document answer reuse
+app.config['REUSE_THRESHOLD'] = float(os.getenv("REUSE_THRESHOLD", 0.95))  # Similarity needed to reuse a stored answer
+app.config['REUSE_MAX_ITEMS'] = int(os.getenv("REUSE_MAX_ITEMS", 100000))
+app.config['REUSE_TTL'] = int(os.getenv("REUSE_TTL", 30 * 24 * 3600))  # Seconds
+app.config['CACHE_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'cache')
+app.config['METRICS_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'metrics')
+app.config['PROFILING_ENABLED'] = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")  # Allow ?profile=1 on /process
+app.config['ADMIN_TOKEN'] = os.getenv("ADMIN_TOKEN", "")  # X-Admin-Token for profiling and /admin; unset = no admin access
+app.config['METRICS_FLUSH_INTERVAL'] = float(os.getenv("METRICS_FLUSH_INTERVAL", 1))  # Seconds a worker's counts may lag /metrics
+app.config['ANSWER_CACHE_MEMORY_ITEMS'] = int(os.getenv("ANSWER_CACHE_MEMORY_ITEMS", 16384))  # One answer per item
+app.config['ANSWER_CACHE_DISK_ITEMS'] = int(os.getenv("ANSWER_CACHE_DISK_ITEMS", 500000))
+app.config['ANSWER_CACHE_TTL'] = int(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))  # Seconds
+app.config['EXTRACTION_CACHE_MEMORY_ITEMS'] = int(os.getenv("EXTRACTION_CACHE_MEMORY_ITEMS", 32))  # Question lists; texts live in TEXT_FOLDER
+app.config['EXTRACTION_CACHE_DISK_ITEMS'] = int(os.getenv("EXTRACTION_CACHE_DISK_ITEMS", 2000))
+app.config['EXTRACTION_CACHE_TTL'] = int(os.getenv("EXTRACTION_CACHE_TTL", 7 * 24 * 3600))  # Seconds
+app.config['TEXT_FOLDER'] = os.path.join(app.config['CACHE_FOLDER'], 'texts')  # Extracted text of each document
+app.config['TEXT_QUOTA_BYTES'] = int(os.getenv("TEXT_QUOTA_BYTES", 1024 * 1024 * 1024))  # Oldest texts are swept first past this
+app.config['PIPELINE_MEMORY_BUDGET'] = int(os.getenv("PIPELINE_MEMORY_BUDGET", 32 * 1024 * 1024))  # Bytes of document text a job keeps in memory
 
 # Ensure upload directory exists with proper permissions
 if not os.path.exists(app.config['UPLOAD_FOLDER']):
     os.makedirs(app.config['UPLOAD_FOLDER'], mode=0o777)
 
+metrics = MetricsRegistry(app.config['METRICS_FOLDER'], flush_interval=app.config['METRICS_FLUSH_INTERVAL'])
+metrics.histogram("querymaster_stage_seconds", "Time spent in each /process pipeline stage, by stage and file format.")
+metrics.histogram("querymaster_upstream_request_seconds", "Upstream chat calls, by HTTP status or failure.")
+metrics.counter("querymaster_upstream_retries_total", "Follow-up upstream calls made for a batch after the first.")
+metrics.counter("querymaster_cache_lookups_total", "Cache lookups, by cache and hit or miss.")
+metrics.counter("querymaster_jobs_total", "Finished jobs, by status and file formats.")
+metrics.histogram("querymaster_job_peak_rss_bytes", "Peak resident memory of the worker while a job ran.", MEMORY_BUCKETS)
+
+def format_label(name, allowed):
+    # Formats come from the form, keep arbitrary values out of metric labels
+    return name if name in allowed else "other"
+
+rate_limiter = None
+if app.config['LLM_RATE_LIMIT'] > 0:
+    rate_limiter = SharedRateLimiter(os.path.join(app.config['CACHE_FOLDER'], 'ratelimit.json'),
+                                     rate=app.config['LLM_RATE_LIMIT'], burst=app.config['LLM_RATE_BURST'],
+                                     max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+                                     backoff=app.config['LLM_BACKOFF'])
+
+llm_client.configure(url=app.config['LLM_API_URL'], pool_size=app.config['LLM_POOL_SIZE'],
+                     connect_timeout=app.config['LLM_CONNECT_TIMEOUT'], read_timeout=app.config['LLM_READ_TIMEOUT'],
+                     limiter=rate_limiter)
+upstream = UpstreamGuard(llm_client.post_chat,
+                         CircuitBreaker(error_rate=app.config['BREAKER_ERROR_RATE'], window=app.config['BREAKER_WINDOW'],
+                                        min_calls=app.config['BREAKER_MIN_CALLS'],
+                                        cooldown=app.config['BREAKER_COOLDOWN']),
+                         hedge_percentile=app.config['LLM_HEDGE_PERCENTILE'],
+                         hedge_min_samples=app.config['LLM_HEDGE_MIN_SAMPLES'], max_workers=app.config['LLM_POOL_SIZE'])
+
+answer_cache = TieredCache(os.path.join(app.config['CACHE_FOLDER'], 'answers.sqlite3'), table="answers",
+                           memory_items=app.config['ANSWER_CACHE_MEMORY_ITEMS'],
+                           disk_items=app.config['ANSWER_CACHE_DISK_ITEMS'], ttl=app.config['ANSWER_CACHE_TTL'])
+extraction_cache = TieredCache(os.path.join(app.config['CACHE_FOLDER'], 'extractions.sqlite3'), table="extractions",
+                               memory_items=app.config['EXTRACTION_CACHE_MEMORY_ITEMS'],
+                               disk_items=app.config['EXTRACTION_CACHE_DISK_ITEMS'],
+                               ttl=app.config['EXTRACTION_CACHE_TTL'])
+os.makedirs(app.config['TEXT_FOLDER'], exist_ok=True)
+reuse_index = None
+if app.config['REUSE_ENABLED']:
+    reuse_index = ReuseIndex(os.path.join(app.config['CACHE_FOLDER'], 'reuse.sqlite3'),
+                             threshold=app.config['REUSE_THRESHOLD'], max_items=app.config['REUSE_MAX_ITEMS'],
+                             ttl=app.config['REUSE_TTL'])
+
+job_store = JobStore(app.config['JOB_FOLDER'])
+job_queue = JobQueue(job_store, max_workers=app.config['JOB_WORKERS'],
+                     max_pending=app.config['JOB_QUEUE_LIMIT'], logger=app.logger)
+
+result_store = ResultStore(app.config['RESULT_FOLDER'], ttl=app.config['RESULT_TTL'],
+                           quota_bytes=app.config['RESULT_QUOTA_BYTES'])
+
+def sweep_texts():
+    # Extracted texts outlive their extraction cache entry by at most one sweep. Entries
+    # trimmed by EXTRACTION_CACHE_DISK_ITEMS leave their text behind, so past TEXT_QUOTA_BYTES
+    # the oldest texts go first, like ResultStore.sweep; a cache hit without its text re-extracts.
+    now = time.time()
+    entries = []
+    for entry in os.scandir(app.config['TEXT_FOLDER']):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        # Temporary files belong to a save in progress unless they're past the TTL
+        entries.append((stat.st_mtime, entry.path, stat.st_size if entry.name.endswith(".txt") else 0))
+
+    total = sum(size for _, _, size in entries)
+    for modified, path, size in sorted(entries):
+        if now - modified > app.config['EXTRACTION_CACHE_TTL'] or (total > app.config['TEXT_QUOTA_BYTES'] and size):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def sweep_jobs():
+    job_store.purge(app.config['RESULT_TTL'])
+    sweep_texts()
+    if app.config['JOB_AUTO_RESUME']:
+        resume_orphaned_jobs()
+
+result_store.start_sweeper(app.config['RESULT_SWEEP_INTERVAL'], on_sweep=sweep_jobs, logger=app.logger)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
@@ -36,109 +221,458 @@ def allowed_file(filename):
 def serve_react():
     return send_from_directory(app.static_folder, "index.html")
 
-def extract_text_from_file(file_path, file_format):
+def iter_text_pieces(pieces, separator="\n"):
+    for index, piece in enumerate(pieces):
+        if index:
+            yield separator
+        yield piece
+
+def iter_document_text(source, file_format):
+    # source is a path or a seekable binary file object such as the spooled upload.
+    # Yields the document's text a page, paragraph or megabyte at a time.
     try:
         if file_format == "pdf":
-            with open(file_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                text = "\n".join([page.extract_text() or "" for page in reader.pages]).strip()
+            yield from iter_text_pieces(iter_pdf_pages(source, workers=app.config['PDF_EXTRACT_WORKERS'],
+                                                       parallel_threshold=app.config['PDF_PARALLEL_THRESHOLD']))
         elif file_format == "docx":
-            doc = Document(file_path)
-            text = "\n".join([para.text for para in doc.paragraphs if para.text]).strip()
+            yield from iter_text_pieces(iter_docx_paragraphs(source))
         elif file_format == "txt":
-            with open(file_path, "r", encoding='utf-8') as file:
-                text = file.read().strip()
+            if isinstance(source, str):
+                with open(source, "r", encoding='utf-8', newline="") as file:
+                    yield from iter(lambda: file.read(1024 * 1024), "")
+            else:
+                reader = io.TextIOWrapper(source, encoding='utf-8', newline="")
+                try:
+                    yield from iter(lambda: reader.read(1024 * 1024), "")
+                finally:
+                    reader.detach()  # The upload is closed by run_job, not by the wrapper
         else:
             raise ValueError(f"Unsupported file format: {file_format}")
-
-        return text or "No extractable text found"
     except Exception as e:
         raise RuntimeError(f"Failed to extract text: {str(e)}")
 
-def generate_answers(questions, context):
-    url = "https://chatgpt-42.p.rapidapi.com/chat"
-    headers = {
-        "x-rapidapi-key": os.getenv("RAPIDAPI_KEY"),
-        "x-rapidapi-host": "chatgpt-42.p.rapidapi.com",
-        "Content-Type": "application/json"
+def request_answers(ids, questions, context, max_tokens):
+    listed = "\n".join(f"{question_id}. {strip_numbering(question)}" for question_id, question in zip(ids, questions))
+    if app.config['STRUCTURED_ANSWERS']:
+        instructions = ("Answer each question. Reply with only a JSON object mapping each question's number "
+                        "to its answer as a string, e.g. {\"1\": \"...\", \"2\": \"...\"}.")
+    else:
+        instructions = "Answer each question, numbering every answer the same as its question."
+    payload = {
+        "messages": [{
+            "role": "user",
+            "content": f"Context: {context}\n\n{instructions}\n\nQuestions:\n{listed}"
+        }],
+        "model": "gpt-4o-mini",
+        "max_tokens": max_tokens
     }
-
-    answers = []
-    batch_size = 10  # Reduced for reliability
-    unwanted_phrases = ["if you have more questions", "feel free to ask", "let me know if you need"]
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = upstream.call(payload)
+        status = str(response.status_code)
+    except CircuitOpen:
+        status = "circuit_open"
+        raise
+    finally:
+        metrics.observe("querymaster_upstream_request_seconds", time.perf_counter() - started, status=status)
+    response.raise_for_status()
+    content = response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
+    return read_answers(ids, content, app.config['STRUCTURED_ANSWERS'])
+
+def request_batch(batch, context, max_tokens=1000):
+    with metrics.time("querymaster_stage_seconds", stage="batch"):
+        return _request_batch(batch, context, max_tokens)
+
+def _request_batch(batch, context, max_tokens):
     max_retries = 3
-
-    for i in range(0, len(questions), batch_size):
-        batch = questions[i:i + batch_size]
-        payload = {
-            "messages": [{
-                "role": "user",
-                "content": f"Context: {context}\n\nQuestions:\n" + "\n".join(batch)
-            }],
-            "model": "gpt-4o-mini",
-            "max_tokens": 1000
-        }
-
-        for attempt in range(max_retries):
+    answers = [None] * len(batch)
+    pending = list(range(len(batch)))
+    error = None
+
+    # Each follow-up only asks for the questions still without a usable answer,
+    # with an output budget sized for them
+    for attempt in range(max_retries):
+        if attempt:
+            metrics.inc("querymaster_upstream_retries_total")
+        ids = [index + 1 for index in pending]
+        questions = [batch[index] for index in pending]
+        budget = sum(batching.estimate_answer_tokens(question, app.config['SHORT_ANSWER_TOKENS'],
+                                                     app.config['LONG_ANSWER_TOKENS']) for question in questions)
+        try:
+            replies = request_answers(ids, questions, context, max_tokens if attempt == 0 else min(max_tokens, budget))
+            for index, reply in zip(pending, replies):
+                answers[index] = reply
+            pending = [index for index in pending if answers[index] is None]
+            if not pending:
+                break
+        except CircuitOpen as e:
+            error = e
+            break  # Retrying can't help until the breaker lets calls through again
+        except Exception as e:
+            error = e
+            if attempt < max_retries - 1 and not llm_client.rate_limited():
+                time.sleep(2)  # Small delay before retry; the limiter paces retries itself
+
+    if error is not None and len(pending) == len(batch):
+        raise RuntimeError(f"API request failed after retries: {str(error)}")
+    return [answer or f"No answer generated for: {question}" for question, answer in zip(batch, answers)]
+
+def batch_context(text, batch):
+    # Read from the document's TextSpool when the batch is sent, so only batches in flight hold one
+    if batch["spans"] is None:
+        return text.read()
+    return "\n...\n".join(span_text(text, span) for span in batch["spans"])
+
+def plan_batches(questions, text):
+    offsets = array("Q")  # Start and end byte of every chunk
+    with text.buffer() as buffer:
+        for span in iter_chunk_spans(buffer, app.config['RETRIEVAL_CHUNK_WORDS']):
+            offsets.extend(span)
+    chunk_count = len(offsets) // 2
+    if chunk_count <= app.config['RETRIEVAL_MAX_CHUNKS']:
+        # Short documents fit in every prompt as they are
+        offsets = None
+        chunk_tokens = [batching.estimate_tokens(text.read())]
+        question_chunks = [{0}] * len(questions)
+    else:
+        chunk_tokens = array("I")
+
+        def chunks():
+            # Read one chunk at a time; search_chunks passes over them twice, sizes are noted on the first
+            for chunk_id in range(chunk_count):
+                chunk = span_text(text, offsets[2 * chunk_id:2 * chunk_id + 2])
+                if chunk_id == len(chunk_tokens):
+                    chunk_tokens.append(batching.estimate_tokens(chunk))
+                yield chunk
+
+        question_chunks = [set(chunk_ids) for chunk_ids in
+                           search_chunks(questions, chunks, app.config['RETRIEVAL_TOP_K'])]
+
+    plan = batching.plan_batches(
+        questions, question_chunks, chunk_tokens,
+        max_input_tokens=app.config['MODEL_CONTEXT_TOKENS'] - app.config['MODEL_MAX_OUTPUT_TOKENS'],
+        max_output_tokens=app.config['MODEL_MAX_OUTPUT_TOKENS'],
+        max_questions=app.config['BATCH_MAX_QUESTIONS'],
+        max_chunks=app.config['RETRIEVAL_MAX_CHUNKS'],
+        short_answer=app.config['SHORT_ANSWER_TOKENS'],
+        long_answer=app.config['LONG_ANSWER_TOKENS'],
+    )
+    for batch in plan:
+        batch["spans"] = None if offsets is None else [tuple(offsets[2 * chunk_id:2 * chunk_id + 2])
+                                                       for chunk_id in batch["chunk_ids"]]
+        batch["context_hash"] = fingerprint(batch_context(text, batch))
+    return plan
+
+def generate_answers(questions, text, on_progress=None, concurrency=None, on_plan=None, on_batch=None,
+                     reuse=False, checkpoint=None, on_checkpoint=None):
+    # Repeated questions are asked once and the answer copied back to every position
+    representatives, positions = dedupe.collapse(questions, app.config['DEDUP_THRESHOLD'])
+    unique = [questions[index] for index in representatives]
+    # Standard questions answered before for another document skip the model entirely
+    unique_answers = reuse_index.lookup(unique) if reuse and reuse_index else [None] * len(unique)
+    pending = [index for index, answer in enumerate(unique_answers) if answer is None]
+    if reuse and reuse_index:
+        metrics.inc("querymaster_cache_lookups_total", len(unique) - len(pending), cache="reuse", result="hit")
+        metrics.inc("querymaster_cache_lookups_total", len(pending), cache="reuse", result="miss")
+
+    plan = plan_batches([unique[index] for index in pending], text)
+    batches = [batch["questions"] for batch in plan]
+    concurrency = max(1, concurrency or app.config['ANSWER_CONCURRENCY'])
+    if on_plan:
+        on_plan(dict(batching.summarize_plan(plan), duplicates=len(questions) - len(unique),
+                     reused=len(unique) - len(pending)))
+
+    # The question positions behind each batch's answers, duplicates included, so answers
+    # shown as batches finish line up with the document's numbering
+    members = [[] for _ in unique]
+    for position, group in enumerate(positions):
+        members[group].append(position)
+    batch_positions = []
+    start = 0
+    for batch in batches:
+        batch_positions.append([members[pending[offset]] for offset in range(start, start + len(batch))])
+        start += len(batch)
+
+    # One slot per batch so answers keep question order whatever order batches finish in
+    results = [None] * len(batches)
+    errors = {}
+    done = 0
+
+    # Answers are kept per question, keyed by the question and its batch's context. A question
+    # is answered from the job's checkpoint when an earlier run answered it, or from the cache
+    # when it was asked with the same context; the model only sees the rest of its batch.
+    keys = [[answer_key(question, batch["context_hash"]) for question in batch["questions"]] for batch in plan]
+    checkpoint = checkpoint or {}
+    asked = []  # Offsets of the questions in each batch that still need the model
+    for index, batch_keys in enumerate(keys):
+        results[index] = [None] * len(batch_keys)
+        for offset, key in enumerate(batch_keys):
+            cached = checkpoint.get(key)
+            source = "checkpoint"
+            if cached is None:
+                cached = answer_cache.get(key)
+                source = "answers"
+            # Entries from when answers were cached per batch hold lists, re-ask those
+            hit = isinstance(cached, str)
+            metrics.inc("querymaster_cache_lookups_total", cache=source, result="hit" if hit else "miss")
+            if hit:
+                results[index][offset] = cached
+        asked.append([offset for offset, answer in enumerate(results[index]) if answer is None])
+        if not asked[index]:
+            done += 1
+            if on_batch:
+                on_batch(index, results[index], False, batch_positions[index])
+    if on_progress and done:
+        on_progress(done, len(batches))
+
+    def answer_batch(index):
+        questions = [batches[index][offset] for offset in asked[index]]
+        return request_batch(questions, batch_context(text, plan[index]), app.config['MODEL_MAX_OUTPUT_TOKENS'])
+
+    misses = [index for index, offsets in enumerate(asked) if offsets]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(misses) or 1)) as executor:
+        futures = {executor.submit(answer_batch, index): index for index in misses}
+        for future in as_completed(futures):
+            index = futures[future]
             try:
-                response = requests.post(url, json=payload, headers=headers, timeout=30)
-                response.raise_for_status()
-                answer = response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
-
-                for phrase in unwanted_phrases:
-                    answer = answer.lower().replace(phrase, "").strip()
-
-                answers.extend(filter(None, answer.split("\n")))
-                break  # Successful request, break retry loop
+                answers = future.result()
             except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(2)  # Small delay before retry
-                else:
-                    raise RuntimeError(f"API request failed after retries: {str(e)}")
-
-    return answers or ["No answers generated"]
-
-def save_answers(answers, file_format):
+                errors[index] = str(e)
+                app.logger.warning(f"Batch {index + 1}/{len(batches)} failed: {str(e)}")
+                answers = [f"No answer generated for: {batches[index][offset]}" for offset in asked[index]]
+            answered = []  # (offset, answer) the model actually answered; the rest are asked again next time
+            for offset, answer in zip(asked[index], answers):
+                results[index][offset] = answer
+                if answer != f"No answer generated for: {batches[index][offset]}":
+                    answered.append((offset, answer))
+            if answered:
+                answer_cache.set_many([(keys[index][offset], answer) for offset, answer in answered])
+                if on_checkpoint:
+                    on_checkpoint([keys[index][offset] for offset, _ in answered], [answer for _, answer in answered])
+                if reuse and reuse_index:
+                    reuse_index.store([batches[index][offset] for offset, _ in answered],
+                                      [answer for _, answer in answered])
+            if on_batch:
+                on_batch(index, results[index], index in errors, batch_positions[index])
+            done += 1
+            if on_progress:
+                on_progress(done, len(batches))
+
+    if misses and len(errors) == len(misses):
+        raise RuntimeError(f"API request failed after retries: {errors[misses[0]]}")
+
+    # Batches hold the pending representatives in order, one answer each
+    fresh = (answer for batch_answers in results for answer in batch_answers)
+    for index, answer in zip(pending, fresh):
+        unique_answers[index] = answer
+    return [unique_answers[group] for group in positions] or ["No answers generated"]
+
+def save_answer_record(answers, job_id):
+    # Canonical copy of a job's answers, every download format is rendered from it
+    file_path = result_store.path_for(job_id, "answers.jsonl")
+    with open(file_path, "w", encoding='utf-8') as f:
+        for answer in answers:
+            f.write(json.dumps({"answer": answer}) + "\n")
+    return result_store.record(job_id, "answers.jsonl")
+
+def load_answer_record(job_id):
+    file_path = result_store.find(job_id, "answers.jsonl")
+    if file_path is None:
+        return None
+    with open(file_path, "r", encoding='utf-8') as f:
+        return [json.loads(line)["answer"] for line in f]
+
+def save_answers(answers, file_format, job_id):
     try:
         if not answers:
             raise ValueError("No answers to save")
 
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"answers.{file_format}")
+        final_path = result_store.path_for(job_id, f"answers.{file_format}")
+        # Render beside the final path and rename, so a concurrent download never sees half a file
+        file_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
 
-        if file_format == "txt":
-            with open(file_path, "w", encoding='utf-8') as f:
-                f.write("\n".join(answers))
+        writer = renderers.WRITERS.get(file_format)
+        if writer is None:
+            raise ValueError(f"Unsupported output format: {file_format}")
+        with metrics.time("querymaster_stage_seconds", stage="render", format=file_format):
+            writer(answers, file_path)
 
-        elif file_format == "docx":
-            doc = Document()
-            for answer in answers:
-                doc.add_paragraph(answer)
-            doc.save(file_path)
-
-        elif file_format == "xlsx":
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            for i, answer in enumerate(answers):
-                ws.cell(row=i+1, column=1, value=answer)
-            wb.save(file_path)
-
-        elif file_format == "pdf":
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-            pdf.cell(200, 10, txt="Generated Answers", ln=True, align="C")
-            pdf.ln(10)
-            for answer in answers:
-                pdf.multi_cell(0, 10, txt=answer)
-                pdf.ln(5)
-            pdf.output(file_path)
-
-        return file_path
+        os.replace(file_path, final_path)
+        return result_store.record(job_id, f"answers.{file_format}")
     except Exception as e:
         raise RuntimeError(f"Failed to save {file_format}: {str(e)}")
 
+def output_format_for(name):
+    file_format = app.config['OUTPUT_FORMAT_ALIASES'].get(name, name)
+    return file_format if file_format in app.config['OUTPUT_FORMATS'] else None
+
+def get_rendering(job_id, file_format):
+    # Each format is rendered once from the answer record and then served from the result store
+    file_path = result_store.find(job_id, f"answers.{file_format}")
+    if file_path is not None:
+        return file_path
+    answers = load_answer_record(job_id)
+    if answers is None:
+        return None
+    return save_answers(answers, file_format, job_id)
+
+def segment_text(text, label):
+    with metrics.time("querymaster_stage_seconds", stage="segment", format=label), text.buffer() as buffer:
+        return split_questions(buffer)
+
+def extract_questions(upload, input_format, content_hash):
+    # Same bytes in the same format always parse to the same text, so repeat uploads skip parsing.
+    # Returns the document as a TextSpool, which the caller closes, with its questions.
+    key = f"{content_hash}:{input_format}"
+    label = format_label(input_format, app.config['ALLOWED_EXTENSIONS'])
+    text_path = os.path.join(app.config['TEXT_FOLDER'], f"{content_hash}.{label}.txt")
+    cached = extraction_cache.get(key)
+    text = None
+    # Entries from before texts were kept on disk, or whose text file was swept, can't be used
+    if cached is not None and "text_file" in cached:
+        try:
+            text = TextSpool.open(text_path)
+        except FileNotFoundError:
+            pass
+    if upload is not None:
+        metrics.inc("querymaster_cache_lookups_total", cache="extractions", result="miss" if text is None else "hit")
+
+    if text is not None:
+        questions = cached["questions"]
+        if questions is None:
+            questions = segment_text(text, label)  # Too big to cache in memory, scan the text file again
+        return text, questions, True
+    if upload is None:
+        # A resumed job no longer has its upload, only what the first run extracted from it
+        raise RuntimeError("The upload is no longer available to resume from, please upload the file again")
+
+    text = TextSpool(max_size=app.config['PIPELINE_MEMORY_BUDGET'])
+    try:
+        with metrics.time("querymaster_stage_seconds", stage="extract", format=label):
+            text.extend(iter_document_text(upload, input_format))
+        questions = segment_text(text, label)
+        text.save(text_path)
+    except Exception:
+        text.close()
+        raise
+    cached_questions = questions if text.size <= app.config['PIPELINE_MEMORY_BUDGET'] else None
+    extraction_cache.set(key, {"text_file": os.path.basename(text_path), "questions": cached_questions})
+    return text, questions, False
+
+def run_job(job_id, upload, input_format, output_format, content_hash, reuse=False):
+    # upload is None when the job is resumed; batches finished by earlier runs come from its checkpoint
+    started = time.perf_counter()
+    status = "failed"
+    resumed = upload is None
+    text = None
+    memory = PeakRssSampler()
+    try:
+        with memory:
+            text, questions, cache_hit = extract_questions(upload, input_format, content_hash)
+            job_store.update(job_id, extraction_cache="hit" if cache_hit else "miss")
+            if upload is not None:
+                upload.close()  # Later stages only read the text, free the spooled upload now
+                upload = None
+
+            if not questions:
+                raise ValueError("No questions detected")
+
+            def on_progress(done, total):
+                job_store.update(job_id, progress={"done": done, "total": total})
+
+            def on_plan(plan):
+                job_store.update(job_id, plan=plan, progress={"done": 0, "total": plan["batches"]})
+                job_store.append_event(job_id, "plan", {"batches": plan["batches"], "questions": len(questions)})
+
+            failed_batches = set()
+
+            def on_batch(index, lines, failed, positions):
+                if failed:
+                    failed_batches.add(index)
+                job_store.append_event(job_id, "batch", {"batch": index, "answers": lines, "positions": positions,
+                                                         "failed": failed})
+
+            def on_checkpoint(keys, lines):
+                job_store.save_batch(job_id, keys, lines)
+
+            answers = generate_answers(questions, text, on_progress=on_progress, on_plan=on_plan,
+                                       on_batch=on_batch, reuse=reuse, checkpoint=job_store.load_batches(job_id),
+                                       on_checkpoint=on_checkpoint)
+            text.close()
+            if resumed:
+                result_store.clear(job_id)  # Renderings of the previous run's answers are stale
+            save_answer_record(answers, job_id)
+            result_file = save_answers(answers, output_format, job_id)
+
+            status = "done"
+            return {"result": result_file, "download_link": f"/download/{job_id}.{output_format}",
+                    "failed_batches": len(failed_batches)}
+    finally:
+        label = format_label(input_format, app.config['ALLOWED_EXTENSIONS'])
+        metrics.observe("querymaster_stage_seconds", time.perf_counter() - started, stage="job", format=label)
+        metrics.inc("querymaster_jobs_total", status=status, input_format=label, output_format=output_format)
+        if memory.peak is not None:
+            # Per worker process, so jobs running beside this one count towards it too
+            metrics.observe("querymaster_job_peak_rss_bytes", memory.peak, input_format=label)
+            job_store.update(job_id, peak_rss_mb=round(memory.peak / (1024 * 1024), 1))
+        if text is not None:
+            text.close()
+        if upload is not None:
+            upload.close()  # Frees the spooled buffer or deletes its temp file
+
+def run_profiled_job(job_id, *args, **kwargs):
+    # Only jobs that asked for it come through here, the rest call run_job directly
+    profiler = RequestProfiler()
+    try:
+        with profiler:
+            return run_job(job_id, *args, **kwargs)
+    finally:
+        for filename in profiler.save(lambda name: result_store.path_for(job_id, name)):
+            result_store.record(job_id, filename)
+        job_store.update(job_id, profile=f"/admin/profiles/{job_id}/profile.txt")
+
+def resumable(job):
+    if job["status"] == "failed":
+        return True
+    if job["status"] == "done":
+        return job.get("failed_batches", 0) > 0
+    return not process_alive(job.get("worker"))  # Queued or running in a worker that has since died
+
+def resume_job(job):
+    # Runs the job again from its checkpoint in this worker. Returns the event log
+    # offset the new run's events start at, or None if another worker resumed it first.
+    attempt = job.get("attempts", 1) + 1
+    if not job_store.claim(job["id"], attempt):
+        return None
+    offset = job_store.events_offset(job["id"])
+    job_store.update(job["id"], status="queued", attempts=attempt, error=None, worker=os.getpid())
+    job_store.append_event(job["id"], "resumed", {"attempt": attempt})
+    try:
+        job_queue.submit(job["id"], run_job, None, job["input_format"], job["output_format"],
+                         job["content_hash"], job.get("reuse", False))
+    except QueueFull as e:
+        job_store.update(job["id"], status="failed", error=str(e))
+        job_store.append_event(job["id"], "failed", {"error": str(e)})
+        raise
+    return offset
+
+def resume_orphaned_jobs():
+    # Jobs whose worker was restarted or killed on timeout would otherwise stay queued or running forever
+    for job in job_store.iter_jobs():
+        if job["status"] not in ("queued", "running") or job.get("attempts", 1) >= app.config['JOB_MAX_ATTEMPTS']:
+            continue
+        if process_alive(job.get("worker")):
+            continue
+        try:
+            if resume_job(job) is not None:
+                app.logger.info(f"Resumed job {job['id']} left behind by worker {job.get('worker')}")
+        except QueueFull:
+            break
+
 @app.route("/process", methods=["POST"])
 def process_file():
+    started = time.perf_counter()
     try:
         if 'file' not in request.files:
             return jsonify({"error": "No file part"}), 400
@@ -150,44 +684,173 @@ def process_file():
         if not allowed_file(file.filename):
             return jsonify({"error": "Invalid file type", "allowed": list(app.config['ALLOWED_EXTENSIONS'])}), 400
 
-        # Ensure the upload folder exists before saving
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-            os.makedirs(app.config['UPLOAD_FOLDER'], mode=0o777)
-
         input_format = request.form.get("input_format", "pdf")
-        output_format = request.form.get("output_format", "txt")
-
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(file_path)
-
-        text = extract_text_from_file(file_path, input_format)
-        questions = [q.strip() + "?" for q in text.replace("\n", " ").split("?") if q.strip()]
-
-        if not questions:
-            os.remove(file_path)  # Cleanup
-            return jsonify({"error": "No questions detected"}), 400
-
-        answers = generate_answers(questions, text)
-        result_file = save_answers(answers, output_format)
-
-        os.remove(file_path)  # Cleanup after processing
-
-        return jsonify({"success": True, "download_link": f"/download/{os.path.basename(result_file)}"})
+        output_format = output_format_for(request.form.get("output_format", "txt"))
+        if output_format is None:
+            return jsonify({"error": "Invalid output format", "allowed": sorted(app.config['OUTPUT_FORMATS'])}), 400
+
+        profile = request.args.get("profile", request.headers.get("X-Profile", "")).lower() in ("1", "true", "yes")
+        if profile and not (app.config['PROFILING_ENABLED'] and is_admin()):
+            return jsonify({"error": "Profiling is not available"}), 403
+
+        # Reuse of answers from other documents is on wherever the server enables it, unless the request opts out
+        reuse = reuse_index is not None and request.form.get("reuse", "on").lower() not in ("0", "false", "off", "no")
+
+        content_hash = upload_fingerprint(file.stream)
+        # Receiving and hashing the upload; werkzeug parses the form on first access above
+        metrics.observe("querymaster_stage_seconds", time.perf_counter() - started, stage="upload",
+                        format=format_label(input_format, app.config['ALLOWED_EXTENSIONS']))
+        job = job_store.create(filename=file.filename, input_format=input_format, output_format=output_format,
+                               content_hash=content_hash, reuse=reuse)
+
+        # Take over the spooled stream, Flask closes request files when the request ends
+        upload = file.stream
+        file.stream = io.BytesIO()
+        upload.seek(0)
+        if job_queue.busy() and hasattr(upload, "rollover"):
+            # A job that has to wait keeps its upload in a temp file, not in memory outside PIPELINE_MEMORY_BUDGET
+            upload.rollover()
+
+        try:
+            # A profiled job runs alone, so no other job pays for its process-wide allocation tracing
+            job_queue.submit(job['id'], run_profiled_job if profile else run_job, upload, input_format, output_format,
+                             content_hash, reuse, exclusive=profile)
+        except QueueFull as e:
+            upload.close()
+            job_store.update(job['id'], status="failed", error=str(e))
+            return jsonify({"error": "Server busy, please retry shortly", "details": str(e)}), 503
+
+        return jsonify({"success": True, "job_id": job['id'], "status_url": f"/jobs/{job['id']}"}), 202
 
     except Exception as e:
         app.logger.error(f"Processing error: {str(e)}\n{traceback.format_exc()}")
         return jsonify({"error": "File processing failed", "details": str(e)}), 500
 
+def public_job(job):
+    return {key: value for key, value in job.items() if key != "result"}
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(public_job(job))
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == "failed":
+        return jsonify({"error": "File processing failed", "details": job["error"]}), 500
+    if job["status"] != "done":
+        return jsonify(public_job(job)), 202
+    file_path = get_rendering(job_id, job["output_format"])
+    if file_path is None:
+        return jsonify({"error": "File not found"}), 404
+    return send_file(os.path.abspath(file_path), as_attachment=True)
+
 @app.route("/download/<filename>", methods=["GET"])
 def download_file(filename):
     try:
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if not os.path.exists(file_path):
+        # Links look like <job id>.<format>, so a user can only fetch their own job's output
+        job_id, _, file_format = filename.partition(".")
+        file_format = output_format_for(file_format)
+        if file_format is None:
+            return jsonify({"error": "Invalid output format", "allowed": sorted(app.config['OUTPUT_FORMATS'])}), 400
+        file_path = get_rendering(job_id, file_format)
+        if file_path is None:
             return jsonify({"error": "File not found"}), 404
-        return send_file(file_path, as_attachment=True)
+        return send_file(os.path.abspath(file_path), as_attachment=True, download_name=f"answers.{file_format}")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/jobs/<job_id>/resume", methods=["POST"])
+def job_resume(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if not resumable(job):
+        return jsonify({"error": "Job cannot be resumed", "status": job["status"]}), 409
+    try:
+        offset = resume_job(job)
+    except QueueFull as e:
+        return jsonify({"error": "Server busy, please retry shortly", "details": str(e)}), 503
+    if offset is None:
+        return jsonify({"error": "Job is already being resumed"}), 409
+    return jsonify({"success": True, "job_id": job_id, "status_url": f"/jobs/{job_id}",
+                    "events_url": f"/jobs/{job_id}/events?offset={offset}"}), 202
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    if job_store.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Event ids are byte offsets into the job's event log, so a reconnecting
+    # EventSource resumes where it left off via Last-Event-ID; ?offset= starts
+    # a new stream after a resumed job's earlier events
+    try:
+        offset = int(request.headers.get("Last-Event-ID", request.args.get("offset", 0)))
+    except ValueError:
+        offset = 0
+
+    def stream(offset):
+        # Each stream ties up a gthread request thread, so it ends after EVENT_STREAM_MAX
+        # seconds and the browser reconnects from its Last-Event-ID a second later
+        started = last_sent = time.time()
+        yield "retry: 1000\n\n"
+        while time.time() - started < app.config['EVENT_STREAM_MAX']:
+            events, offset = job_store.read_events(job_id, offset)
+            for event_id, event in events:
+                yield f"id: {event_id}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+                if event["event"] in ("complete", "failed"):
+                    return
+            if events:
+                last_sent = time.time()
+            elif time.time() - last_sent >= app.config['EVENT_HEARTBEAT']:
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            time.sleep(app.config['EVENT_POLL_INTERVAL'])
+
+    return Response(stream_with_context(stream(offset)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"answers": answer_cache.stats(), "extractions": extraction_cache.stats(),
+                    "reuse": reuse_index.stats() if reuse_index else None,
+                    "rate_limit": rate_limiter.stats() if rate_limiter else None, "upstream": upstream.stats()})
+
+def is_admin():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(app.config['ADMIN_TOKEN']) and hmac.compare_digest(token, app.config['ADMIN_TOKEN'])
+
+@app.route("/admin/profiles", methods=["GET"])
+def admin_profiles():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    profiles = []
+    for manifest in result_store.manifests():
+        files = {name: info for name, info in manifest["files"].items() if name in PROFILE_FILES}
+        if files:
+            profiles.append({"job_id": manifest["job_id"], "created": min(info["created"] for info in files.values()),
+                             "files": {name: {"size": info["size"], "url": f"/admin/profiles/{manifest['job_id']}/{name}"}
+                                       for name, info in files.items()}})
+    return jsonify({"profiles": sorted(profiles, key=lambda profile: profile["created"], reverse=True)})
+
+@app.route("/admin/profiles/<job_id>/<filename>", methods=["GET"])
+def admin_profile_file(job_id, filename):
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    file_path = result_store.find(job_id, filename) if filename in PROFILE_FILES else None
+    if file_path is None:
+        return jsonify({"error": "File not found"}), 404
+    return send_file(os.path.abspath(file_path), as_attachment=True, download_name=f"{job_id}-{filename}")
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/<path:path>")
 def serve_static(path):
     return send_from_directory(app.static_folder, path)
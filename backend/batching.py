@@ -0,0 +1,72 @@
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+LONG_ANSWER_PATTERN = re.compile(
+    r"\b(explain|describe|discuss|compare|contrast|elaborate|evaluate|analy[sz]e|justify|why|how)\b",
+    re.IGNORECASE,
+)
+PROMPT_OVERHEAD = 16  # Chat framing plus the "Context:" and "Questions:" labels
+
+
+def estimate_tokens(text):
+    # Close to what BPE tokenizers give for English: a token per short word or
+    # symbol, plus one for every 8 characters of a long word
+    return sum(1 + len(piece) // 8 for piece in TOKEN_PATTERN.findall(text))
+
+
+def estimate_answer_tokens(question, short_answer=60, long_answer=250):
+    return long_answer if LONG_ANSWER_PATTERN.search(question) else short_answer
+
+
+def plan_batches(questions, question_chunks, chunk_tokens, max_input_tokens, max_output_tokens,
+                 max_questions=40, max_chunks=None, short_answer=60, long_answer=250):
+    # Greedily packs consecutive questions into as few requests as fit the model's
+    # input and output budgets. question_chunks[i] is the set of context chunk ids
+    # question i needs and chunk_tokens[c] the estimated size of chunk c.
+    batches = []
+    current = None
+    for question, hits in zip(questions, question_chunks):
+        question_tokens = estimate_tokens(question) + 1
+        answer_tokens = estimate_answer_tokens(question, short_answer, long_answer)
+
+        if current is not None:
+            chunk_ids = current["chunk_ids"] | hits
+            prompt_tokens = (PROMPT_OVERHEAD + current["question_tokens"] + question_tokens
+                             + sum(chunk_tokens[chunk_id] for chunk_id in chunk_ids))
+            if (len(current["questions"]) < max_questions
+                    and prompt_tokens <= max_input_tokens
+                    and current["completion_tokens"] + answer_tokens <= max_output_tokens
+                    and (max_chunks is None or len(chunk_ids) <= max_chunks)):
+                current["questions"].append(question)
+                current["chunk_ids"] = chunk_ids
+                current["question_tokens"] += question_tokens
+                current["prompt_tokens"] = prompt_tokens
+                current["completion_tokens"] += answer_tokens
+                continue
+            batches.append(current)
+
+        # A question too large for the budget on its own still gets a request of its own
+        current = {
+            "questions": [question],
+            "chunk_ids": set(hits),
+            "question_tokens": question_tokens,
+            "prompt_tokens": PROMPT_OVERHEAD + question_tokens + sum(chunk_tokens[chunk_id] for chunk_id in hits),
+            "completion_tokens": answer_tokens,
+        }
+    if current is not None:
+        batches.append(current)
+
+    for batch in batches:
+        batch["chunk_ids"] = sorted(batch["chunk_ids"])
+        del batch["question_tokens"]
+    return batches
+
+
+def summarize_plan(batches):
+    return {
+        "batches": len(batches),
+        "prompt_tokens": sum(batch["prompt_tokens"] for batch in batches),
+        "completion_tokens": sum(batch["completion_tokens"] for batch in batches),
+        "per_batch": [[len(batch["questions"]), batch["prompt_tokens"], batch["completion_tokens"]]
+                      for batch in batches],
+    }
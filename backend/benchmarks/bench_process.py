@@ -0,0 +1,295 @@
+"""Throughput and latency of /process end to end, against a local mock of the chat API.
+
+    python benchmarks/bench_process.py [--sizes 10,100,1000] [--formats txt,docx,pdf]
+                                       [--requests 8] [--concurrency 4] [--workers 2]
+                                       [--latency-median 0.8] [--throttle-rate 0.05] ...
+                                       [--compare benchmarks/results/<earlier run>.json]
+
+Generates question papers of each size (number of questions) and format,
+starts benchmarks/mock_llm.py and the backend under gunicorn (the Flask dev
+server with --server flask) in a scratch directory, then submits --requests
+uploads per size and format, --concurrency at a time. Each upload is
+distinct, so the extraction and answer caches start cold. Latency runs from
+the POST to the job reaching done or failed.
+
+Reports requests/sec, p50/p95/p99 latency, peak RSS of the server processes
+and the per-stage breakdown from /metrics, and writes it all to
+benchmarks/results/<timestamp>.json. --compare prints the change from an
+earlier result file. Backend settings such as LLM_RATE_LIMIT are taken from
+the environment. Run from the backend folder.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm import add_mock_arguments, mock_options, start_mock  # noqa: E402
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+METRIC_LINE = re.compile(r"^(querymaster_\w+?)_(sum|count)\{(.*)\} (\S+)$")
+TOPICS = ("photosynthesis", "inflation", "plate tectonics", "the French Revolution", "binary search",
+          "supply chains", "the water cycle", "electromagnetism", "game theory", "protein folding",
+          "urbanisation", "machine learning", "the immune system", "thermodynamics", "the Silk Road")
+TEMPLATES = ("What is the role of {topic} in {field}?", "Explain how {topic} affects {field}.",
+             "Describe two examples of {topic} observed in {field}.", "Why does {topic} matter for {field}?",
+             "Compare {topic} with {other} in the context of {field}.")
+FIELDS = ("biology", "economics", "geology", "history", "computer science", "logistics",
+          "physics", "mathematics", "chemistry", "sociology", "medicine", "engineering")
+
+
+def question_paper(count, seed):
+    # Numbered questions varied enough that dedupe keeps them apart; the seed makes each upload unique
+    rng = random.Random(seed)
+    lines = [f"Question paper {seed}", "Answer all questions."]
+    for n in range(1, count + 1):
+        template = rng.choice(TEMPLATES)
+        question = template.format(topic=rng.choice(TOPICS), other=rng.choice(TOPICS), field=rng.choice(FIELDS))
+        lines.append(f"{n}. {question[:-1]} (item {rng.randrange(10 ** 6)}){question[-1]}")
+    return lines
+
+
+def write_paper(lines, file_format, path):
+    if file_format == "txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+    elif file_format == "docx":
+        from docx import Document
+        document = Document()
+        for line in lines:
+            document.add_paragraph(line)
+        document.save(path)
+    elif file_format == "pdf":
+        from fpdf import FPDF
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", size=11)
+        for line in lines:
+            pdf.multi_cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+        pdf.output(path)
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(server, workers, port, workdir, llm_url):
+    env = dict(os.environ, LLM_API_URL=llm_url, RAPIDAPI_KEY=os.getenv("RAPIDAPI_KEY", "bench"),
+               PYTHONPATH=BACKEND + os.pathsep + os.getenv("PYTHONPATH", ""))
+    if server == "gunicorn":
+        # Same worker model as start.sh
+        command = [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+                   "--worker-class", "gthread", "--threads", "8", "--timeout", "120", "wsgi:app"]
+    else:
+        command = [sys.executable, "-c",
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    # The backend keeps uploads/ relative to its working directory, so every run starts empty
+    process = subprocess.Popen(command, cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, "server.log"), "wb"))
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with {process.returncode}, see {workdir}/server.log")
+        try:
+            requests.get(f"{base}/metrics", timeout=1)
+            return process, base
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 60s")
+
+
+def process_tree(root):
+    # The gunicorn master, its workers and any PDF extraction processes they spawned
+    parents = {}
+    for name in os.listdir("/proc") if os.path.isdir("/proc") else ():
+        if name.isdigit():
+            try:
+                with open(f"/proc/{name}/stat", "r") as f:
+                    parents.setdefault(int(f.read().rsplit(")", 1)[1].split()[1]), []).append(int(name))
+            except (OSError, IndexError):
+                continue
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(parents.get(pid, ()))
+    return tree
+
+
+def peak_rss_mb(root):
+    # VmHWM is each process's own high-water mark; None where /proc isn't available
+    peaks = []
+    for pid in process_tree(root):
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        peaks.append(int(line.split()[1]) / 1024)
+        except OSError:
+            continue
+    return round(max(peaks), 1) if peaks else None
+
+
+def scrape(base):
+    # {(metric, labels): [sum, count]} from the backend's /metrics
+    totals = {}
+    for line in requests.get(f"{base}/metrics", timeout=10).text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, kind, labels, value = match.groups()
+            totals.setdefault((name, labels), [0.0, 0.0])[0 if kind == "sum" else 1] = float(value)
+    return totals
+
+
+def breakdown(before, after):
+    stages, upstream = {}, {}
+    for (name, labels), (total, count) in after.items():
+        previous_total, previous_count = before.get((name, labels), (0.0, 0.0))
+        calls = count - previous_count
+        if not calls:
+            continue
+        entry = {"count": int(calls), "mean_ms": round((total - previous_total) / calls * 1000, 2)}
+        if name == "querymaster_stage_seconds":
+            stages[labels] = entry
+        elif name == "querymaster_upstream_request_seconds":
+            upstream[labels] = entry
+    return stages, upstream
+
+
+def run_upload(base, path, file_format, output_format, poll_interval):
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        response = requests.post(f"{base}/process", files={"file": (os.path.basename(path), f)},
+                                 data={"input_format": file_format, "output_format": output_format}, timeout=120)
+    if response.status_code != 202:
+        return time.perf_counter() - started, f"http {response.status_code}"
+    status_url = f"{base}{response.json()['status_url']}"
+    while True:
+        job = requests.get(status_url, timeout=30).json()
+        if job["status"] in ("done", "failed"):
+            return time.perf_counter() - started, None if job["status"] == "done" else job.get("error")
+        time.sleep(poll_interval)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] if ordered else None
+
+
+def run_level(base, server_pid, paths, file_format, args):
+    before = scrape(base)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(
+            lambda path: run_upload(base, path, file_format, args.output_format, args.poll_interval), paths))
+    elapsed = time.perf_counter() - started
+    stages, upstream = breakdown(before, scrape(base))
+    latencies = [latency for latency, error in outcomes if error is None]
+    return {
+        "requests": len(outcomes),
+        "failed": sum(error is not None for _, error in outcomes),
+        "errors": sorted({error for _, error in outcomes if error is not None})[:5],
+        "requests_per_sec": round(len(latencies) / elapsed, 3),
+        "p50_s": round(percentile(latencies, 50), 3) if latencies else None,
+        "p95_s": round(percentile(latencies, 95), 3) if latencies else None,
+        "p99_s": round(percentile(latencies, 99), 3) if latencies else None,
+        "peak_rss_mb": peak_rss_mb(server_pid),
+        "stages": stages,
+        "upstream": upstream,
+    }
+
+
+def compare(current, previous_path):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {(level["format"], level["size"]): level for level in json.load(f)["levels"]}
+    print(f"\nchange from {previous_path}")
+    for level in current["levels"]:
+        old = previous.get((level["format"], level["size"]))
+        if old is None:
+            continue
+        deltas = []
+        for key in ("requests_per_sec", "p50_s", "p95_s", "p99_s", "peak_rss_mb"):
+            if level[key] is not None and old.get(key):
+                deltas.append(f"{key} {(level[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"{level['format']:>5} {level['size']:>6}  " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="questions per paper, comma separated")
+    parser.add_argument("--formats", default="txt,docx,pdf")
+    parser.add_argument("--output-format", default="txt")
+    parser.add_argument("--requests", type=int, default=8, help="uploads per size and format")
+    parser.add_argument("--concurrency", type=int, default=4, help="uploads in flight")
+    parser.add_argument("--server", choices=("gunicorn", "flask"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="seconds between job status polls")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    formats = args.formats.split(",")
+    workdir = tempfile.mkdtemp(prefix="bench-process-")
+    mock = start_mock(**mock_options(args))
+    backend, base = start_backend(args.server, args.workers, free_port(), workdir,
+                                  f"http://127.0.0.1:{mock.server_address[1]}/chat")
+    levels = []
+    try:
+        print(f"{'format':>6} {'size':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'rss MB':>8} {'failed':>6}")
+        for size in sizes:
+            for file_format in formats:
+                paths = []
+                for n in range(args.requests):
+                    path = os.path.join(workdir, f"paper-{size}-{n}.{file_format}")
+                    write_paper(question_paper(size, seed=size * 100003 + n), file_format, path)
+                    paths.append(path)
+                level = dict(format=file_format, size=size, **run_level(base, backend.pid, paths, file_format, args))
+                levels.append(level)
+                print(f"{file_format:>6} {size:>6} {level['requests_per_sec']:>8} {level['p50_s']!s:>8} "
+                      f"{level['p95_s']!s:>8} {level['p99_s']!s:>8} {level['peak_rss_mb']!s:>8} {level['failed']:>6}")
+                for labels, stage in sorted(level["stages"].items()):
+                    print(f"{'':>14} {labels:<40} {stage['count']:>6} x {stage['mean_ms']:>10} ms")
+    finally:
+        backend.terminate()
+        backend.wait(timeout=30)
+        mock.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": vars(args),
+        "mock_responses": {str(status): count for status, count in mock.chat.counts.items()},
+        "levels": levels,
+    }
+    os.makedirs(RESULTS, exist_ok=True)
+    path = os.path.join(RESULTS, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults written to {path}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
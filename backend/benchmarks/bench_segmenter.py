@@ -0,0 +1,84 @@
+"""Compare the old split("?") question detection with segmenter.py.
+
+    python benchmarks/bench_segmenter.py [--mb 20] [--file questions.txt]
+
+Without --file a synthetic question bank of roughly --mb megabytes is
+generated. Run from the backend folder.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segmenter import split_questions, split_questions_in_file  # noqa: E402
+
+LINES = [
+    "{n}. What is the function of the mitochondria in a eukaryotic cell?",
+    "Q{n}) Explain why the sky appears blue, e.g. in terms of Rayleigh scattering.",
+    "({letter}) Define osmosis and give one example from plant biology.",
+    "See https://example.com/search?q=cells&page={n} for background reading.",
+    "Read the passage below carefully before answering the questions that follow.",
+    "How does the U.S. Senate differ from the House of Representatives?",
+]
+
+
+def legacy_split(text):
+    return [q.strip() + "?" for q in text.replace("\n", " ").split("?") if q.strip()]
+
+
+def synthetic_text(megabytes, seed=0):
+    rng = random.Random(seed)
+    lines, size, n = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        n += 1
+        line = rng.choice(LINES).format(n=n, letter="abcdefgh"[n % 8])
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def measure(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<24} {elapsed:8.3f}s  peak {peak / 1024 / 1024:8.1f} MB  {len(result):>9} questions")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=20, help="size of the generated input")
+    parser.add_argument("--file", help="benchmark this UTF-8 text file instead")
+    args = parser.parse_args()
+
+    if args.file:
+        path = args.file
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_text(args.mb)
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    try:
+        print(f"input: {len(text.encode('utf-8')) / 1024 / 1024:.1f} MB")
+        measure("legacy split('?')", legacy_split, text)
+        measure("segmenter (str)", split_questions, text)
+        measure("segmenter (mmap file)", split_questions_in_file, path)
+    finally:
+        if not args.file:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Local stand-in for the RapidAPI chat endpoint generate_answers talks to.
+
+    python benchmarks/mock_llm.py [--port 8099] [--latency-median 0.8] [--latency-p99 4]
+                                  [--error-rate 0.01] [--throttle-rate 0.05] [--answer-words 40]
+
+Answers every numbered question in the prompt with --answer-words words, as
+the JSON object the structured prompt asks for. Latency is log-normal with
+the given median and p99; --error-rate of requests get a 500 and
+--throttle-rate a 429 with Retry-After. Point the backend at it with
+LLM_API_URL=http://127.0.0.1:8099/chat.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUESTION_LINE = re.compile(r"^(\d+)\. ", re.MULTILINE)
+WORDS = ("cell energy light force market river theory signal protein climate vector policy "
+         "language memory circuit reaction orbit pressure trade network").split()
+Z_99 = 2.3263  # Standard normal quantile of the 99th percentile
+
+
+class MockChat:
+    def __init__(self, latency_median=0.8, latency_p99=4.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, answer_words=40, seed=None):
+        self.mu = math.log(max(latency_median, 1e-6))
+        self.sigma = max(math.log(max(latency_p99, latency_median) / max(latency_median, 1e-6)) / Z_99, 0.0)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.answer_words = answer_words
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def _draw(self):
+        with self._lock:
+            return self._random.random(), self._random.lognormvariate(self.mu, self.sigma)
+
+    def _count(self, status):
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+
+    def respond(self, payload):
+        # Returns (status, headers, body)
+        roll, latency = self._draw()
+        if roll < self.throttle_rate:
+            self._count(429)
+            return 429, {"Retry-After": str(self.retry_after)}, {"message": "Too many requests"}
+        time.sleep(latency)
+        if roll < self.throttle_rate + self.error_rate:
+            self._count(500)
+            return 500, {}, {"message": "Upstream error"}
+
+        prompt = payload["messages"][-1]["content"]
+        questions = prompt.rsplit("Questions:\n", 1)[-1]
+        answers = {number: " ".join(WORDS[(int(number) + i) % len(WORDS)] for i in range(self.answer_words))
+                   for number in QUESTION_LINE.findall(questions)}
+        self._count(200)
+        return 200, {}, {"choices": [{"message": {"role": "assistant", "content": json.dumps(answers)}}]}
+
+
+def start_mock(host="127.0.0.1", port=0, **options):
+    # Serves in a daemon thread; returns the server, whose server_address has the bound port
+    chat = MockChat(**options)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/chat":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.send_error(400)
+                return
+            status, headers, body = chat.respond(payload)
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.chat = chat
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--latency-median", type=float, default=0.8, help="seconds")
+    parser.add_argument("--latency-p99", type=float, default=4.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--answer-words", type=int, default=40, help="words per answer")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def mock_options(args):
+    return {"latency_median": args.latency_median, "latency_p99": args.latency_p99, "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate, "retry_after": args.retry_after,
+            "answer_words": args.answer_words, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_mock(args.host, args.port, **mock_options(args))
+    print(f"mock chat endpoint on http://{args.host}:{server.server_address[1]}/chat")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"responses: {server.chat.counts}")
+
+
+if __name__ == "__main__":
+    main()
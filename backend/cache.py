@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_question(question):
+    return " ".join(question.lower().split())
+
+
+def answer_key(question, context_hash):
+    # One question's answer given its batch's context, so editing or dropping another
+    # question in the batch doesn't lose it
+    return f"{fingerprint(normalize_question(question))}:{context_hash}"
+
+
+class TieredCache:
+    # In-memory LRU in front of a SQLite table shared by every gunicorn worker.
+    # Values must be JSON serialisable.
+    def __init__(self, path, table="cache", memory_items=1024, disk_items=50000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.table = table
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connect().execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        # sqlite3 connections can't cross threads or forks, so keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        conn = self._connect()
+        row = conn.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            self._count("misses")
+            return None
+
+        conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        self._count("disk_hits")
+        return value
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        # (key, value) pairs written in one transaction
+        now = time.time()
+        for key, value in items:
+            self._remember(key, value, now)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in items],
+            )
+        with self._lock:
+            before = self._writes
+            self._writes += len(items)
+            sweep = self._writes // 100 != before // 100
+        if sweep:
+            self.evict()
+
+    def _remember(self, key, value, created):
+        with self._lock:
+            self._memory[key] = (value, created)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def evict(self):
+        conn = self._connect()
+        expired = conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl,)).rowcount
+        overflow = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.disk_items
+        if overflow > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)", (overflow,)
+            )
+        self._count("evictions", expired + max(overflow, 0))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, memory_items=len(self._memory))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["disk_items"] = self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        stats["pid"] = os.getpid()
+        return stats
@@ -0,0 +1,126 @@
+import hashlib
+import re
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from collections import defaultdict
+
+from retrieval import STOPWORDS
+from segmenter import strip_numbering
+
+WORD_PATTERN = re.compile(r"\w+")
+NUMBER_PATTERN = re.compile(r"\d+")
+SHINGLE_SIZE = 5  # Characters per shingle of the normalized question
+NUM_PERM = 32
+BANDS = 4  # LSH bands of NUM_PERM // BANDS rows; pairs above ~0.85 similarity usually share one
+SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+# Words that flip what a question asks while barely moving its shingle similarity;
+# "t" is what normalize() leaves of n't
+NEGATIONS = frozenset("not no never none nor neither cannot t except without".split())
+POLARITY_WORDS = NEGATIONS | frozenset("true false correct incorrect most least best worst always".split())
+NOT_STEMS = {"can": "can", "won": "will"}  # What's left of can't and won't without the n
+
+
+def normalize(question):
+    # Case, punctuation, spacing and the item number don't change what is being asked
+    return " ".join(WORD_PATTERN.findall(strip_numbering(question).lower()))
+
+
+def polarity(normalized):
+    # Near-duplicates must agree on these, so "...is true?" never shares an answer with "...is not true?"
+    return sorted("not" if word in NEGATIONS else word for word in normalized.split() if word in POLARITY_WORDS)
+
+
+def content_words(normalized):
+    # Near-duplicates must use the same words once stopwords are dropped, so a long
+    # question about "ATP" never shares an answer with the same one about "ADP".
+    # n't and cannot read as "not", so contractions still match their spelled-out form.
+    words = []
+    for word in normalized.split():
+        if word == "t" and words and words[-1].endswith("n"):
+            stem = words.pop()
+            words.extend((NOT_STEMS.get(stem, stem[:-1]), "not"))
+        elif word == "cannot":
+            words.extend(("can", "not"))
+        else:
+            words.append(word)
+    return frozenset(word for word in words if word not in STOPWORDS)
+
+
+def shingles(normalized):
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+@lru_cache(maxsize=1 << 16)
+def _digest(shingle):
+    # NUM_PERM independent little-endian 32-bit hashes from one extendable-output
+    # digest; stable across processes, unlike hash(). Shingles repeat a lot across
+    # a question bank, hence the cache, which keeps the 128 raw bytes rather than
+    # 32 int objects (~1.2 KB an entry) so a full cache stays around 20 MB.
+    return hashlib.shake_128(shingle.encode("utf-8")).digest(SIGNATURE.size)
+
+
+def minhash(shingle_set):
+    hashes = array("I", b"".join(map(_digest, shingle_set)))
+    if sys.byteorder == "big":
+        hashes.byteswap()
+    # Row r of every digest sits at r, r + NUM_PERM, ...; min over a stride runs in C
+    return tuple(min(hashes[perm::NUM_PERM]) for perm in range(NUM_PERM))
+
+
+def lsh_keys(signature):
+    rows = NUM_PERM // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def collapse(questions, threshold=0.9):
+    # Returns (representatives, positions): the indices of the questions worth
+    # asking, and for every question the index in representatives of the one
+    # whose answer it shares. The first occurrence always represents a group.
+    # Near-duplicates need shingle similarity >= threshold, the same numbers,
+    # the same negation and polarity words and the same content words, so "What
+    # is 2+3?" and "What is 2+4?" stay apart, as do "...is true?" and "...is not
+    # true?" and questions about city A and city B; threshold >= 1 only
+    # collapses questions that normalize identically.
+    representatives = []
+    positions = []
+    exact = {}
+    buckets = defaultdict(list)
+    features = []  # (normalized, numbers, polarity, content words) per representative; shingle sets are rebuilt for
+                   # LSH candidates only, keeping ~100 strings per question out of memory
+    for index, question in enumerate(questions):
+        normalized = normalize(question)
+        group = exact.get(normalized)
+
+        if group is None and threshold < 1:
+            question_shingles = shingles(normalized)
+            numbers = NUMBER_PATTERN.findall(normalized)
+            markers = polarity(normalized)
+            words = content_words(normalized)
+            keys = lsh_keys(minhash(question_shingles))
+            best = threshold
+            for candidate in dict.fromkeys(c for key in keys for c in buckets.get(key, ())):
+                candidate_normalized, candidate_numbers, candidate_markers, candidate_words = features[candidate]
+                if candidate_numbers != numbers or candidate_markers != markers or candidate_words != words:
+                    continue
+                similarity = jaccard(question_shingles, shingles(candidate_normalized))
+                if similarity >= best:
+                    group, best = candidate, similarity
+            if group is None:
+                for key in keys:
+                    buckets[key].append(len(representatives))
+                features.append((normalized, numbers, markers, words))
+
+        if group is None:
+            group = len(representatives)
+            representatives.append(index)
+        exact.setdefault(normalized, group)
+        positions.append(group)
+    return representatives, positions
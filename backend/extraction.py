@@ -0,0 +1,153 @@
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+import PyPDF2
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_PARAGRAPH = f"{W_NS}p"
+W_BODY = f"{W_NS}body"
+W_RUN = f"{W_NS}r"
+W_TEXT = f"{W_NS}t"
+W_BREAK = f"{W_NS}br"
+# Run content python-docx's paragraph.text turns into characters. Only children of a
+# w:r count: w:tab also defines tab stops in w:pPr/w:tabs, and a page or column break is ""
+W_RUN_TEXT = {f"{W_NS}tab": "\t", f"{W_NS}ptab": "\t", W_BREAK: "\n", f"{W_NS}cr": "\n",
+              f"{W_NS}noBreakHyphen": "-"}
+W_BREAK_TYPE = f"{W_NS}type"
+
+_pool = None
+_pool_pid = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool, _pool_pid, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid() or _pool_workers != workers:
+            # spawn, not fork: the gunicorn worker has live threads and sockets
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_pid = None
+
+
+def _extract_page_range(path, start, stop):
+    with open(path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+@contextmanager
+def _shared_path(source):
+    # A path pool workers can open themselves, so the PDF is never pickled to each task.
+    # A spooled upload that rolled over is reopened through /proc; only one still in
+    # memory is copied out to a temp file.
+    if isinstance(source, str):
+        yield source
+        return
+    raw = getattr(source, "_file", source)  # SpooledTemporaryFile's buffer or temp file
+    if not isinstance(raw, io.BytesIO):
+        name = getattr(raw, "name", None)  # An int fd for an unlinked TemporaryFile
+        if isinstance(name, str) and os.path.isfile(name):
+            yield name
+            return
+        try:
+            path = f"/proc/{os.getpid()}/fd/{raw.fileno()}"
+        except (AttributeError, OSError):
+            path = None
+        if path is not None and os.path.exists(path):
+            yield path
+            return
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as copy:
+        shutil.copyfileobj(source, copy, 1024 * 1024)
+        copy.flush()
+        yield copy.name
+
+
+def _source_size(source):
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def iter_pdf_pages(source, workers=1, parallel_threshold=2 * 1024 * 1024):
+    # Text of each page in page order; source is a file path or a seekable binary file object
+    reader = PyPDF2.PdfReader(source)
+    page_count = len(reader.pages)
+    if workers <= 1 or page_count < 2 or _source_size(source) < parallel_threshold:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    # Each worker parses the file itself and extracts a contiguous page range;
+    # map() hands the ranges back in page order
+    workers = min(workers, page_count)
+    step = -(-page_count // workers)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    done = 0
+    with _shared_path(source) as path:
+        try:
+            pool = _get_pool(workers)
+            for page_texts in pool.map(_extract_page_range, [path] * len(ranges), *zip(*ranges)):
+                for text in page_texts:
+                    yield text
+                    done += 1
+        except BrokenProcessPool:
+            shutdown_pool()
+            yield from _extract_page_range(path, done, page_count)
+
+
+def iter_docx_paragraphs(source):
+    # Streams word/document.xml out of the zip and yields the text of every
+    # non-empty paragraph in document order, table cells included, dropping
+    # each top-level block once it has been read so memory stays flat
+    with zipfile.ZipFile(source) as archive, archive.open("word/document.xml") as xml:
+        body = None
+        open_tags = []  # Tags of the elements enclosing the current one
+        paragraphs = []  # Text of the open paragraphs; text boxes nest them
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                open_tags.append(elem.tag)
+                if elem.tag == W_PARAGRAPH:
+                    paragraphs.append([])
+                elif elem.tag == W_BODY:
+                    body = elem
+                continue
+
+            open_tags.pop()
+            if elem.tag == W_PARAGRAPH:
+                text = "".join(paragraphs.pop())
+                if text:
+                    yield text
+            elif paragraphs and open_tags and open_tags[-1] == W_RUN:
+                if elem.tag == W_TEXT:
+                    paragraphs[-1].append(elem.text or "")
+                elif elem.tag == W_BREAK and elem.get(W_BREAK_TYPE, "textWrapping") != "textWrapping":
+                    pass  # Page and column breaks
+                elif elem.tag in W_RUN_TEXT:
+                    paragraphs[-1].append(W_RUN_TEXT[elem.tag])
+            if len(open_tags) == 2 and body is not None:
+                body.remove(elem)
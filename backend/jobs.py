@@ -0,0 +1,238 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def process_alive(pid):
+    # Signal 0 checks for the process without touching it
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+class JobStore:
+    # Job records live on disk so any gunicorn worker can answer status polls,
+    # not just the one running the job.
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.folder, f"{job_id}.json")
+
+    def create(self, **fields):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created": now,
+            "updated": now,
+            "progress": {"done": 0, "total": 0},
+            "error": None,
+            "attempts": 1,
+            "worker": os.getpid(),
+            **fields,
+        }
+        self._write(job)
+        return job
+
+    def get(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id or ""):
+            return None
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            job["updated"] = time.time()
+            self._write(job)
+            return job
+
+    def append_event(self, job_id, event, data):
+        # Append-only log per job, tailed by the SSE endpoint in whichever worker serves it
+        line = json.dumps({"event": event, "data": data}) + "\n"
+        with self._lock, open(os.path.join(self.folder, f"{job_id}.events"), "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def read_events(self, job_id, offset=0):
+        events = []
+        try:
+            with open(os.path.join(self.folder, f"{job_id}.events"), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Still being written
+                    offset += len(line)
+                    try:
+                        events.append((offset, json.loads(line)))
+                    except ValueError:
+                        continue  # Client resumed from an offset inside a line
+        except FileNotFoundError:
+            pass
+        return events, offset
+
+    def events_offset(self, job_id):
+        try:
+            return os.path.getsize(os.path.join(self.folder, f"{job_id}.events"))
+        except FileNotFoundError:
+            return 0
+
+    def save_batch(self, job_id, keys, answers):
+        # Checkpoint of one finished batch, an answer per question key, so a resumed
+        # run finds each answer again even if the plan shifted around it
+        line = (json.dumps({"keys": keys, "answers": answers}) + "\n").encode("utf-8")
+        with self._lock, open(os.path.join(self.folder, f"{job_id}.batches"), "a+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line  # Don't glue onto a line a killed worker left unfinished
+            f.write(line)
+
+    def load_batches(self, job_id):
+        # Question key -> answer from every checkpointed batch
+        answers = {}
+        try:
+            with open(os.path.join(self.folder, f"{job_id}.batches"), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Cut short when its worker was killed
+                    # Records from before answers were kept per question can't be lined up, so re-ask
+                    answers.update(zip(record.get("keys", ()), record["answers"]))
+        except FileNotFoundError:
+            pass
+        return answers
+
+    def claim(self, job_id, attempt):
+        # Exactly one worker wins each attempt number, however many try at once
+        try:
+            fd = os.open(os.path.join(self.folder, f"{job_id}.claim{attempt}"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def iter_jobs(self):
+        for name in os.listdir(self.folder):
+            if name.endswith(".json"):
+                job = self.get(name[:-len(".json")])
+                if job is not None:
+                    yield job
+
+    def purge(self, max_age):
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass  # Another worker's sweeper got there first
+
+    def _write(self, job):
+        # Write-then-rename so readers in other workers never see a partial file
+        path = self._path(job["id"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+
+class JobQueue:
+    # Exclusive jobs run alone in this worker: they wait for running jobs to
+    # finish, and other jobs wait while one is waiting or running.
+    def __init__(self, store, max_workers=2, max_pending=20, logger=None):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.logger = logger
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._turns = threading.Condition()
+        self._running = 0
+        self._exclusive = 0  # Exclusive jobs waiting or running
+
+    def _get_executor(self):
+        # Created lazily so each forked gunicorn worker gets its own threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def submit(self, job_id, fn, *args, exclusive=False, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"Job queue is full ({self.max_pending} pending)")
+            self._pending += 1
+            executor = self._get_executor()
+        executor.submit(self._run, job_id, fn, args, kwargs, exclusive)
+
+    def busy(self):
+        # Every worker thread has a job, so the next one waits in the queue
+        with self._lock:
+            return self._pending >= self.max_workers
+
+    def _take_turn(self, exclusive):
+        with self._turns:
+            if exclusive:
+                self._exclusive += 1
+                self._turns.wait_for(lambda: self._running == 0)
+            else:
+                self._turns.wait_for(lambda: self._exclusive == 0)
+            self._running += 1
+
+    def _end_turn(self, exclusive):
+        with self._turns:
+            self._running -= 1
+            if exclusive:
+                self._exclusive -= 1
+            self._turns.notify_all()
+
+    def _run(self, job_id, fn, args, kwargs, exclusive=False):
+        self._take_turn(exclusive)  # The job stays queued until then
+        try:
+            self.store.update(job_id, status="running", started=time.time(), worker=os.getpid())
+            result = fn(job_id, *args, **kwargs) or {}
+            self.store.update(job_id, status="done", finished=time.time(), **result)
+            self.store.append_event(job_id, "complete", {"download_link": result.get("download_link")})
+        except Exception as e:
+            if self.logger:
+                self.logger.exception(f"Job {job_id} failed")
+            self.store.update(job_id, status="failed", finished=time.time(), error=str(e))
+            self.store.append_event(job_id, "failed", {"error": str(e)})
+        finally:
+            self._end_turn(exclusive)
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
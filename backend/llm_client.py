@@ -0,0 +1,90 @@
+import atexit
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = "https://chatgpt-42.p.rapidapi.com/chat"
+
+_settings = {
+    "url": DEFAULT_API_URL,
+    "pool_size": 10,
+    "connect_timeout": 5,
+    "read_timeout": 30,
+}
+_session = None
+_session_pid = None
+_limiter = None
+_lock = threading.Lock()
+
+
+def configure(url=None, pool_size=None, connect_timeout=None, read_timeout=None, limiter=None):
+    global _limiter
+    if limiter is not None:
+        _limiter = limiter
+    for key, value in (("url", url), ("pool_size", pool_size),
+                       ("connect_timeout", connect_timeout), ("read_timeout", read_timeout)):
+        if value is not None:
+            _settings[key] = value
+    close()  # Next call rebuilds the session with the new settings
+
+
+def _build_session():
+    session = requests.Session()
+    # Retries stay in generate_answers, the adapter only pools keep-alive connections
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_settings["pool_size"],
+                          max_retries=0, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "x-rapidapi-key": os.getenv("RAPIDAPI_KEY") or "",
+        "x-rapidapi-host": urlparse(_settings["url"]).netloc,
+        "Content-Type": "application/json",
+    })
+    return session
+
+
+def get_session():
+    global _session, _session_pid
+    # Rebuild after a fork, pooled sockets must not be shared between gunicorn workers
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _build_session()
+                _session_pid = os.getpid()
+    return _session
+
+
+def rate_limited():
+    return _limiter is not None
+
+
+def post_chat(payload, timeout=None, *, acquired=None):
+    # acquired() is called right before the request goes out, after any wait for a rate-limit slot
+    timeout = timeout or (_settings["connect_timeout"], _settings["read_timeout"])
+    if _limiter is None:
+        if acquired:
+            acquired()
+        return get_session().post(_settings["url"], json=payload, timeout=timeout)
+    # Every worker draws from the same quota and backs off together on 429s
+    with _limiter.slot() as outcome:
+        if acquired:
+            acquired()
+        response = get_session().post(_settings["url"], json=payload, timeout=timeout)
+        outcome["status"] = response.status_code
+        outcome["retry_after"] = response.headers.get("Retry-After")
+        return response
+
+
+def close():
+    global _session, _session_pid
+    with _lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+atexit.register(close)
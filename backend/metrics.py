@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+MEMORY_BUCKETS = tuple(megabytes * 1024 * 1024 for megabytes in (64, 128, 192, 256, 320, 384, 448, 512, 768, 1024))
+
+
+def current_rss():
+    # Resident set size of this process in bytes, or None without /proc
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class PeakRssSampler:
+    # Highest RSS of this worker process seen while the with-block runs. RSS is
+    # per process, so jobs running side by side in one worker share their peak.
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            rss = current_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+        return False
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f"{name}=\"{value}\"" for (name, _), value in zip(labels, escaped)) + "}"
+
+
+class MetricsRegistry:
+    # Counters and histograms kept in memory per process and snapshotted to
+    # <folder>/<pid>-<start>.json every flush_interval seconds. render() sums
+    # the snapshots of every gunicorn worker, past ones included, so totals stay
+    # monotonic when a worker is restarted.
+    def __init__(self, folder, flush_interval=1.0):
+        self.folder = folder
+        self.flush_interval = flush_interval
+        self._metrics = {}  # name -> (type, help, buckets)
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self._snapshot = None
+        os.makedirs(folder, exist_ok=True)
+
+    def counter(self, name, help_text):
+        self._metrics[name] = ("counter", help_text, None)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._metrics[name] = ("histogram", help_text, tuple(buckets))
+
+    def _start_flusher(self):
+        # One flusher thread per forked worker, started on first use like the job pool
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            if self._flusher_pid is not None:
+                # Forked after the parent counted something; those counts are the parent's
+                self._counters.clear()
+                self._histograms.clear()
+            self._flusher_pid = os.getpid()
+            self._snapshot = os.path.join(self.folder, f"{os.getpid()}-{int(time.time())}.json")
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except OSError:
+                    pass  # Metrics must never take a worker down
+
+        threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+
+    def inc(self, name, amount=1, **labels):
+        self._start_flusher()
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        self._start_flusher()
+        buckets = self._metrics[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def flush(self):
+        if self._snapshot is None:
+            return
+        with self._lock:
+            snapshot = {
+                "counters": [[name, labels, value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, labels, counts] for (name, labels), counts in self._histograms.items()],
+            }
+        # Write-then-rename so render() in another worker never reads half a snapshot
+        tmp_path = f"{self._snapshot}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self._snapshot)
+
+    def render(self):
+        self.flush()
+        counters, histograms = {}, {}
+        for filename in os.listdir(self.folder):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, filename), "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.get(key)
+                if merged is None or len(merged) != len(counts):
+                    histograms[key] = list(counts)
+                else:
+                    histograms[key] = [a + b for a, b in zip(merged, counts)]
+
+        lines = []
+        for name, (kind, help_text, buckets) in self._metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for (metric, labels), counts in sorted(histograms.items()):
+                if metric != name or len(counts) != len(buckets) + 2:
+                    continue
+                for bound, count in zip(buckets + (math.inf,), counts[:-2] + [counts[-1]]):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(counts[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {counts[-1]}")
+        return "\n".join(lines) + "\n"
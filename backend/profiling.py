@@ -0,0 +1,71 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+
+PROFILE_FILES = ("profile.pstats", "profile.txt", "allocations.txt")
+_active = threading.Lock()  # tracemalloc is process-wide and Python 3.12+ allows one profiler at a time
+# cProfile only hooks the thread that enables it
+NOT_CAPTURED = (
+    "Not captured: cProfile covers the job thread only. Answer batches run on their own threads and show up\n"
+    "here as time waiting on their futures; PDF pages extracted by the process pool show up as time waiting\n"
+    "on the pool. allocations.txt covers every thread in this worker but not the pool's processes.\n\n"
+)
+
+
+class RequestProfiler:
+    # cProfile of the calling thread plus tracemalloc allocation statistics for
+    # whatever runs inside the with-block. tracemalloc slows every thread in the
+    # process, so callers run profiled work alone (JobQueue's exclusive jobs).
+    # One profile runs per worker at a time; a second one that overlaps it runs
+    # unprofiled and says so.
+    def __init__(self, top=50):
+        self.top = top
+        self._profile = cProfile.Profile()
+        self._owner = False
+        self._snapshot = None
+        self._peak = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self._owner = _active.acquire(blocking=False)
+        if self._owner:
+            tracemalloc.start()
+            self._profile.enable()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self._started
+        if self._owner:
+            self._profile.disable()
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            _active.release()
+        return False
+
+    def save(self, path_for):
+        # path_for(filename) -> path; returns the filenames written
+        if not self._owner:
+            with open(path_for("profile.txt"), "w", encoding="utf-8") as f:
+                f.write(f"wall time {self.elapsed:.3f}s\n\nNot profiled: another profile was running in this worker\n")
+            return ["profile.txt"]
+        self._profile.dump_stats(path_for("profile.pstats"))
+
+        summary = io.StringIO()
+        summary.write(f"wall time {self.elapsed:.3f}s\n\n")
+        summary.write(NOT_CAPTURED)
+        stats = pstats.Stats(self._profile, stream=summary).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        with open(path_for("profile.txt"), "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+
+        with open(path_for("allocations.txt"), "w", encoding="utf-8") as f:
+            f.write(f"peak traced memory {self._peak / 1024 / 1024:.1f} MB\n\n")
+            for stat in self._snapshot.statistics("lineno")[:self.top]:
+                f.write(f"{stat}\n")
+        return list(PROFILE_FILES)
@@ -0,0 +1,147 @@
+import email.utils
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from jobs import process_alive
+
+try:
+    import fcntl
+except ImportError:  # Windows dev servers run one process, the thread lock is enough there
+    fcntl = None
+
+MAX_RETRY_AFTER = 60  # Seconds; don't let one odd header park every worker for longer
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+def parse_retry_after(value):
+    # Retry-After is either delay-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class SharedRateLimiter:
+    # Token bucket plus an AIMD concurrency window for upstream calls, kept in
+    # one small state file that every gunicorn worker locks and updates, so the
+    # quota is shared instead of each worker spending it on its own. The window
+    # grows by 1/window per success and halves on a 429, a 5xx or a failed
+    # request; Retry-After (or backoff) pauses every worker at once.
+    def __init__(self, path, rate=5.0, burst=10, max_concurrency=16, min_concurrency=1, backoff=2.0):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stats = {"acquired": 0, "backoffs": 0, "waited": 0.0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @contextmanager
+    def _state(self):
+        with self._state_lock, open(self.path, "a+", encoding="utf-8") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)  # Released when the file closes
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            now = time.time()
+            state.setdefault("tokens", float(self.burst))
+            state.setdefault("refilled", now)
+            state.setdefault("window", float(self.max_concurrency))
+            state.setdefault("paused_until", 0.0)
+            state.setdefault("in_flight", {})
+            yield state, now
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+
+    def _refill(self, state, now):
+        elapsed = max(now - state["refilled"], 0.0)
+        state["tokens"] = min(float(self.burst), state["tokens"] + elapsed * self.rate)
+        state["refilled"] = now
+        # Slots held by a worker that was killed mid-request would otherwise leak
+        state["in_flight"] = {pid: count for pid, count in state["in_flight"].items()
+                              if count > 0 and process_alive(int(pid))}
+
+    def acquire(self, timeout=60):
+        deadline = time.time() + timeout
+        started = time.time()
+        pid = str(os.getpid())
+        while True:
+            with self._state() as (state, now):
+                self._refill(state, now)
+                in_flight = sum(state["in_flight"].values())
+                if (now >= state["paused_until"] and state["tokens"] >= 1
+                        and in_flight < int(state["window"])):
+                    state["tokens"] -= 1
+                    state["in_flight"][pid] = state["in_flight"].get(pid, 0) + 1
+                    with self._lock:
+                        self._stats["acquired"] += 1
+                        self._stats["waited"] += now - started
+                    return
+                if now >= state["paused_until"] and state["tokens"] >= 1:
+                    wait = 0.05  # Waiting on the window, a slot frees when a request finishes
+                else:
+                    wait = max(state["paused_until"] - now, (1 - state["tokens"]) / self.rate, 0.01)
+            if time.time() + wait > deadline:
+                raise RateLimitTimeout(f"No upstream request slot within {timeout}s")
+            time.sleep(min(wait, 0.5))
+
+    def release(self, status=None, retry_after=None):
+        # status is the upstream HTTP status, or None when the request itself failed
+        pid = str(os.getpid())
+        congested = status is None or status == 429 or status >= 500
+        with self._state() as (state, now):
+            self._refill(state, now)
+            state["in_flight"][pid] = max(state["in_flight"].get(pid, 0) - 1, 0)
+            if not congested:
+                state["window"] = min(float(self.max_concurrency), state["window"] + 1 / state["window"])
+                return
+            # Concurrent requests fail together; only the first of them halves the window
+            if now >= state["paused_until"]:
+                state["window"] = max(float(self.min_concurrency), state["window"] / 2)
+            delay = parse_retry_after(retry_after)
+            state["paused_until"] = max(state["paused_until"], now + (self.backoff if delay is None else delay))
+            state["tokens"] = min(state["tokens"], 0.0)
+        with self._lock:
+            self._stats["backoffs"] += 1
+
+    @contextmanager
+    def slot(self, timeout=60):
+        # Yields a dict the caller fills with "status" and "retry_after" from the response
+        self.acquire(timeout)
+        outcome = {"status": None, "retry_after": None}
+        try:
+            yield outcome
+        finally:
+            self.release(outcome["status"], outcome["retry_after"])
+
+    def stats(self):
+        with self._state() as (state, now):
+            self._refill(state, now)
+            shared = {
+                "window": round(state["window"], 2),
+                "tokens": round(state["tokens"], 2),
+                "in_flight": sum(state["in_flight"].values()),
+                "paused_for": round(max(state["paused_until"] - now, 0.0), 2),
+            }
+        with self._lock:
+            stats = dict(self._stats, waited=round(self._stats["waited"], 3))
+        return dict(stats, **shared, pid=os.getpid())
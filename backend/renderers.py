@@ -0,0 +1,209 @@
+import inspect
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import docx
+import openpyxl
+
+# PDF library fallback
+try:
+    from fpdf import FPDF
+    from fpdf.enums import Align, XPos, YPos
+except ImportError:
+    from fpdf2 import FPDF as FPDF
+    from fpdf2.enums import Align, XPos, YPos
+try:
+    from fpdf.line_break import TextLine
+except ImportError:
+    try:
+        from fpdf2.line_break import TextLine
+    except ImportError:
+        TextLine = None
+
+DOCX_TEMPLATE = os.path.join(os.path.dirname(docx.__file__), "templates", "default.docx")
+DOCX_SPECIAL_CHARS = re.compile(r"([\t\n\r])")
+XML_INVALID_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+# Breaks, tabs, soft hyphens and unusual spaces get multi_cell's full line breaker
+PDF_MULTI_CELL_ONLY = re.compile("[\n\r\f\t\u00a0\u00ad\u200b\u2000-\u200a\u205f\u3000]")
+PDF_LINE_HEIGHT = 10
+PDF_TOLERANCE = 1e-9
+
+_char_widths = {}  # (font key, size) -> {char: width}, shared by every PDF this worker renders
+# Private fpdf2 methods the PDF fast path calls: (positional arguments, keyword arguments)
+PDF_PRIVATE_API = {
+    "_render_styled_text_line": (1, ("h", "new_x", "new_y")),
+    "_perform_page_break_if_need_be": (1, ()),
+    "_preload_font_styles": (2, ()),  # txt in older releases, text in newer ones
+}
+PDF_TEXT_LINE_FIELDS = ("fragments", "text_width", "number_of_spaces", "align", "height", "max_width", "trailing_nl")
+
+
+def write_txt(answers, file_path):
+    with open(file_path, "w", encoding='utf-8') as f:
+        for index, answer in enumerate(answers):
+            f.write(f"\n{answer}" if index else answer)
+
+
+def write_xlsx(answers, file_path):
+    # write_only streams rows to disk instead of holding every cell object in memory
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet")
+    for answer in answers:
+        ws.append([answer])
+    wb.save(file_path)
+
+
+def _docx_paragraph(text):
+    # Same markup python-docx emits for doc.add_paragraph(text)
+    text = XML_INVALID_CHARS.sub("", text)
+    if not text:
+        return "<w:p/>"
+    parts = []
+    for piece in DOCX_SPECIAL_CHARS.split(text):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\n", "\r"):
+            parts.append("<w:br/>")
+        elif piece:
+            space = ' xml:space="preserve"' if piece != piece.strip() else ""
+            parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    return f"<w:p><w:r>{''.join(parts)}</w:r></w:p>"
+
+
+def write_docx(answers, file_path):
+    # Copies python-docx's default template and streams the body XML straight
+    # into the zip, so the document matches Document()+add_paragraph() output
+    with zipfile.ZipFile(DOCX_TEMPLATE) as template, \
+            zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as out:
+        for item in template.infolist():
+            if item.filename != "word/document.xml":
+                out.writestr(item, template.read(item.filename))
+                continue
+            body = template.read(item.filename).decode("utf-8")
+            head, _, tail = body.partition("<w:body>")
+            section = tail[tail.index("<w:sectPr"):]
+            with out.open("word/document.xml", "w") as f:
+                f.write(f"{head}<w:body>".encode("utf-8"))
+                for answer in answers:
+                    f.write(_docx_paragraph(answer).encode("utf-8"))
+                f.write(section.encode("utf-8"))
+
+
+def _widths_for(pdf):
+    return _char_widths.setdefault((pdf.font_family, pdf.font_style, pdf.font_size_pt), {})
+
+
+def _pdf_fast_path_options():
+    # Checked once at import: options for the fast path, or None when this fpdf2
+    # doesn't have the private API it was written against and every answer goes
+    # through multi_cell instead
+    if TextLine is None or getattr(TextLine, "_fields", ())[:len(PDF_TEXT_LINE_FIELDS)] != PDF_TEXT_LINE_FIELDS:
+        return None
+    if any(field not in TextLine._field_defaults for field in TextLine._fields[len(PDF_TEXT_LINE_FIELDS):]):
+        return None
+    parameters = {}
+    for name, (positional, keywords) in PDF_PRIVATE_API.items():
+        try:
+            parameters[name] = inspect.signature(getattr(FPDF, name)).parameters
+        except (AttributeError, TypeError, ValueError):
+            return None
+        names = list(parameters[name])[1:]  # Without self
+        if len(names) < positional or any(keyword not in names[positional:] for keyword in keywords):
+            return None
+    return {"prevent_font_change": "prevent_font_change" in parameters["_render_styled_text_line"]}
+
+
+PDF_FAST_PATH = _pdf_fast_path_options()
+
+
+def _layout_lines(pdf, text, widths, max_width):
+    # Same word wrapping as FPDF's MultiLineBreak, but with per-character widths
+    # looked up once instead of re-measuring the whole line for every character.
+    # Yields (start, end, next_start, justify) spans of text.
+    start = 0
+    width = 0.0
+    last_space = None
+    index = 0
+    while index < len(text):
+        char = text[index]
+        char_width = widths.get(char)
+        if char_width is None:
+            char_width = widths[char] = pdf.get_string_width(char)
+        if width + char_width - max_width > PDF_TOLERANCE:
+            if char == " ":
+                yield start, index, index + 1, True
+                start = index + 1
+            elif last_space is not None:
+                yield start, last_space, last_space + 1, True
+                start = last_space + 1
+            elif index > start:
+                yield start, index, index, False  # Word wider than the line, break it anywhere
+                start = index
+            else:
+                raise ValueError("Not enough horizontal space to render a single character")
+            width = 0.0
+            last_space = None
+            index = start
+            continue
+        if char == " ":
+            last_space = index
+        width += char_width
+        index += 1
+    yield start, len(text), len(text), False
+
+
+def _pdf_answer(pdf, answer, widths, options):
+    if options is None:
+        pdf.multi_cell(0, PDF_LINE_HEIGHT, answer)  # This fpdf2 doesn't match the fast path's private API
+        return
+    text = pdf.normalize_text(answer)
+    if not text or PDF_MULTI_CELL_ONLY.search(text):
+        pdf.multi_cell(0, PDF_LINE_HEIGHT, answer)
+        return
+
+    line_width = pdf.w - pdf.r_margin - pdf.x
+    lines = list(_layout_lines(pdf, text, widths, line_width - 2 * pdf.c_margin))
+    for number, (start, end, _, justify) in enumerate(lines):
+        line = text[start:end]
+        pdf._perform_page_break_if_need_be(PDF_LINE_HEIGHT)
+        is_last_line = number == len(lines) - 1
+        text_line = TextLine(
+            pdf._preload_font_styles(line, False),
+            text_width=pdf.get_string_width(line),
+            number_of_spaces=line.count(" "),
+            align=Align.J if justify else Align.L,
+            height=PDF_LINE_HEIGHT,
+            max_width=line_width,
+            trailing_nl=False,
+        )
+        kwargs = {"prevent_font_change": False} if options["prevent_font_change"] else {}
+        pdf._render_styled_text_line(
+            text_line,
+            h=PDF_LINE_HEIGHT,
+            new_x=XPos.RIGHT if is_last_line else XPos.LEFT,
+            new_y=YPos.NEXT,
+            **kwargs,
+        )
+
+
+def write_pdf(answers, file_path):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="Generated Answers", ln=True, align="C")
+    pdf.ln(10)
+    widths = _widths_for(pdf)
+    for answer in answers:
+        _pdf_answer(pdf, answer, widths, PDF_FAST_PATH)
+        pdf.ln(5)
+    pdf.output(file_path)
+
+
+WRITERS = {
+    "txt": write_txt,
+    "docx": write_docx,
+    "xlsx": write_xlsx,
+    "pdf": write_pdf,
+}
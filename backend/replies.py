@@ -0,0 +1,92 @@
+import json
+import re
+
+ANSWER_NUMBER = re.compile(r"^\W*(?:q|answer)?\s*(\d{1,3})\s*[.):]\**\s*", re.IGNORECASE)
+UNWANTED_PHRASES = ["if you have more questions", "feel free to ask", "let me know if you need"]
+# One complete "id": answer member of a JSON object, the answer a string, number
+# or boolean; a string cut off before its closing quote, or a number or boolean
+# not yet followed by , or }, never matches
+JSON_PAIR = re.compile(r'"\s*(?:q|question)?\s*(\d{1,3})\s*"\s*:\s*'
+                       r'("(?:[^"\\]|\\.)*"|(?:-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false)(?=\s*[,}]))',
+                       re.IGNORECASE)
+
+
+def clean_answer(answer):
+    for phrase in UNWANTED_PHRASES:
+        answer = answer.lower().replace(phrase, "").strip()
+    return answer
+
+
+def _json_members(content):
+    # (key, value) pairs of the reply object. A reply that doesn't parse, most
+    # often one cut off at max_tokens, only yields the pairs that arrived whole.
+    start, end = content.find("{"), content.rfind("}")
+    reply = None
+    if start != -1 and end > start:
+        try:
+            reply = json.loads(content[start:end + 1])
+        except ValueError:
+            reply = None
+    if isinstance(reply, dict):
+        # {"answers": {"1": ...}} wraps the object asked for
+        if len(reply) == 1:
+            key, value = next(iter(reply.items()))
+            if isinstance(value, dict) and not re.search(r"\d", str(key)):
+                reply = value
+        return list(reply.items())
+
+    members = []
+    for match in JSON_PAIR.finditer(content):
+        try:
+            members.append((match.group(1), json.loads(match.group(2))))
+        except ValueError:
+            continue
+    return members
+
+
+def parse_json_answers(ids, content):
+    # Answers keyed by question id, e.g. {"1": "...", "2": "..."}; anything
+    # missing, empty, cut off or not text comes back as None so it can be asked again
+    by_id = {}
+    for key, value in _json_members(content):
+        digits = re.sub(r"\D", "", str(key))
+        if isinstance(value, dict):
+            value = value.get("answer")  # {"1": {"answer": "..."}}
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            value = "\n".join(value)
+        elif isinstance(value, (bool, int, float)):
+            value = str(value)  # {"1": 4} on a maths paper, {"2": true} on a true/false one
+        if digits and isinstance(value, str) and value.strip():
+            by_id[int(digits)] = clean_answer(value)
+    return [by_id.get(question_id) or None for question_id in ids]
+
+
+def align_answers(ids, lines):
+    # Plain-text replies: a line numbered with a question's id starts its
+    # answer and unnumbered lines continue it
+    numbered = {}
+    current = None
+    for line in lines:
+        match = ANSWER_NUMBER.match(line)
+        if match and int(match.group(1)) in ids:
+            current = int(match.group(1))
+            numbered.setdefault(current, []).append(line[match.end():].strip())
+        elif current is not None:
+            numbered[current].append(line.strip())
+
+    if numbered:
+        return ["\n".join(filter(None, numbered[i])) or None if i in numbered else None for i in ids]
+    if len(lines) == len(ids):
+        return [line.strip() or None for line in lines]
+    # No numbering to go by; keep every line, the overflow on the last question
+    answers = [line.strip() for line in lines[:len(ids) - 1]] + ["\n".join(lines[len(ids) - 1:])]
+    return ([answer or None for answer in answers] + [None] * len(ids))[:len(ids)]
+
+
+def read_answers(ids, content, structured=True):
+    # One answer or None per id. Once a structured reply holds any JSON, only its
+    # complete pairs count: a reply cut off at max_tokens would otherwise pass raw
+    # JSON off as answers. A reply without any is read as numbered lines.
+    if structured and "{" in content:
+        return parse_json_answers(ids, content)
+    return align_answers(ids, list(filter(None, clean_answer(content).split("\n"))))
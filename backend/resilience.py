@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ratelimit import RateLimitTimeout
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # Opens once at least error_rate of the last `window` calls failed, fails
+    # every call fast for `cooldown` seconds, then lets a single trial call
+    # through: success closes it again, failure re-opens it. ok=None records a
+    # call that never reached upstream or was throttled, which says nothing
+    # about its health.
+    # allow() hands out the current generation as a ticket and every change of
+    # state starts a new one, so only the trial decides a half-open breaker and
+    # stragglers sent before it opened (or re-closed) are ignored.
+    def __init__(self, error_rate=0.5, window=20, min_calls=10, cooldown=30):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._trial = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def allow(self):
+        # A ticket to pass back to record(), or None when the call must fail fast
+        with self._lock:
+            if self._opened_at is None:
+                return self._generation
+            if time.monotonic() - self._opened_at >= self.cooldown and not self._trial:
+                self._trial = True
+                self._generation += 1
+                return self._generation
+            self._stats["rejected"] += 1
+            return None
+
+    def record(self, ticket, ok):
+        with self._lock:
+            if ticket != self._generation:
+                return  # Allowed before the breaker last changed state
+            if self._opened_at is not None:
+                # Only the half-open trial holds the current ticket here
+                self._trial = False
+                self._generation += 1
+                if ok is None:
+                    return  # The next allow() lets another trial through
+                if ok:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            if ok is None:
+                return
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures >= self.error_rate * len(self._outcomes):
+                self._opened_at = time.monotonic()
+                self._generation += 1
+                self._stats["opened"] += 1
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self._trial or time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            recent = len(self._outcomes)
+            stats["error_rate"] = round(self._outcomes.count(False) / recent, 4) if recent else 0.0
+        stats["state"] = self.state()
+        return stats
+
+
+class LatencyTracker:
+    # Rolling window of successful call latencies, in seconds
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percent, min_samples=20):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _succeeded(response):
+    return response.status_code != 429 and response.status_code < 500
+
+
+class UpstreamGuard:
+    # Wraps a blocking send(payload, acquired=...) -> response, where send calls
+    # acquired() once any rate-limit wait is over and the request goes out.
+    # Latency and the hedge delay are counted from there, so time spent queued
+    # for a slot never triggers a hedge. A call still running after the
+    # hedge_percentile latency of recent calls gets a duplicate, and whichever
+    # answers well first wins. The slower twin can't be interrupted mid-read, so
+    # it finishes in the background and its response is closed and ignored. The
+    # breaker sees one outcome per call, however many requests that took.
+    def __init__(self, send, breaker, hedge_percentile=95, hedge_min_samples=20, max_workers=16):
+        self.send = send
+        self.breaker = breaker
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_workers = max_workers
+        self.latency = LatencyTracker()
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def _get_executor(self):
+        # Created lazily so each forked gunicorn worker gets its own threads
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upstream")
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _timed_send(self, payload, on_sent=None):
+        started = []
+
+        def acquired():
+            started.append(time.monotonic())
+            if on_sent:
+                on_sent()
+
+        response = self.send(payload, acquired=acquired)
+        if started and _succeeded(response):
+            self.latency.add(time.monotonic() - started[0])
+        return response
+
+    def call(self, payload):
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise CircuitOpen("Upstream circuit is open after repeated failures, not sending the request")
+        with self._lock:
+            self._stats["calls"] += 1
+        ok = False
+        try:
+            response = self._call(payload)
+            # A 429 is the limiter's to handle, it pauses every worker for Retry-After;
+            # only 5xx, timeouts and connection errors say upstream is unhealthy
+            ok = None if response.status_code == 429 else _succeeded(response)
+            return response
+        except RateLimitTimeout:
+            ok = None  # Never left this host, upstream may be fine
+            raise
+        finally:
+            self.breaker.record(ticket, ok)
+
+    def _call(self, payload):
+        delay = self.latency.percentile(self.hedge_percentile, self.hedge_min_samples) if self.hedge_percentile else None
+        if delay is None:
+            return self._timed_send(payload)
+
+        executor = self._get_executor()
+        sent = threading.Event()
+        primary = executor.submit(self._timed_send, payload, sent.set)
+        primary.add_done_callback(lambda _: sent.set())  # Also wakes us if it failed before sending
+        sent.wait()
+        pending = {primary}
+        done, pending = wait(pending, timeout=delay)
+        if not done:
+            pending.add(executor.submit(self._timed_send, payload))
+            with self._lock:
+                self._stats["hedged"] += 1
+
+        # First good response wins; a 429/5xx or an error only counts once its twin has failed too
+        result = error = None
+        while True:
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    if error is None or isinstance(error, RateLimitTimeout):
+                        error = e  # An upstream failure says more than a copy that never got a slot
+                    continue
+                if result is None or (not _succeeded(result) and _succeeded(response)):
+                    if result is not None:
+                        result.close()
+                    result, winner = response, future
+                else:
+                    response.close()
+            if (result is not None and _succeeded(result)) or not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future in pending:
+            future.cancel()
+            future.add_done_callback(_discard)
+        if result is None:
+            raise error
+        if winner is not primary:
+            with self._lock:
+                self._stats["hedge_wins"] += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        delay = self.latency.percentile(self.hedge_percentile, self.hedge_min_samples) if self.hedge_percentile else None
+        stats["hedge_after"] = round(delay, 3) if delay is not None else None
+        stats["breaker"] = self.breaker.stats()
+        return stats
+
+
+def _discard(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+from jobs import JOB_ID_PATTERN
+
+
+class ResultStore:
+    # One directory per job under the results folder, each with a manifest of
+    # the files it holds so the sweeper can evict by age and total size.
+    def __init__(self, folder, ttl=24 * 3600, quota_bytes=500 * 1024 * 1024):
+        self.folder = folder
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        self._sweeper = None
+        os.makedirs(folder, exist_ok=True)
+
+    def job_dir(self, job_id):
+        if not JOB_ID_PATTERN.match(job_id or ""):
+            raise ValueError(f"Invalid job id: {job_id}")
+        return os.path.join(self.folder, job_id)
+
+    def path_for(self, job_id, filename):
+        path = os.path.join(self.job_dir(job_id), os.path.basename(filename))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def record(self, job_id, filename):
+        # Call once a file has been fully written to path_for(job_id, filename)
+        with self._lock:
+            manifest = self.manifest(job_id) or {"job_id": job_id, "created": time.time(), "files": {}}
+            path = self.path_for(job_id, filename)
+            manifest["files"][os.path.basename(filename)] = {"size": os.path.getsize(path), "created": time.time()}
+            manifest_path = os.path.join(self.job_dir(job_id), "manifest.json")
+            tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, manifest_path)
+            return path
+
+    def manifest(self, job_id):
+        try:
+            with open(os.path.join(self.job_dir(job_id), "manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            return None
+
+    def find(self, job_id, filename):
+        manifest = self.manifest(job_id)
+        if manifest is None or os.path.basename(filename) not in manifest["files"]:
+            return None
+        path = os.path.join(self.job_dir(job_id), os.path.basename(filename))
+        return path if os.path.exists(path) else None
+
+    def clear(self, job_id):
+        # Drops every file of a job, e.g. renderings of answers that are about to change
+        with self._lock:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def manifests(self):
+        for job_id in os.listdir(self.folder):
+            manifest = self.manifest(job_id)
+            if manifest is not None:
+                yield manifest
+
+    def sweep(self):
+        now = time.time()
+        entries = []
+        for job_id in os.listdir(self.folder):
+            manifest = self.manifest(job_id)
+            if manifest is None:
+                # Directory of a job still writing its first file, or a stray; age it by mtime
+                try:
+                    created = os.path.getmtime(os.path.join(self.folder, job_id))
+                except FileNotFoundError:
+                    continue
+                manifest = {"created": created, "files": {}}
+            entries.append((manifest["created"], job_id, sum(f["size"] for f in manifest["files"].values())))
+
+        removed = 0
+        total = sum(size for _, _, size in entries)
+        for created, job_id, size in sorted(entries):
+            if now - created > self.ttl or (total > self.quota_bytes and size):
+                shutil.rmtree(os.path.join(self.folder, job_id), ignore_errors=True)
+                total -= size
+                removed += 1
+        return removed
+
+    def start_sweeper(self, interval=300, on_sweep=None, logger=None):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.sweep()
+                    if on_sweep:
+                        on_sweep()
+                    if removed and logger:
+                        logger.info(f"Result sweeper removed {removed} job outputs")
+                except Exception:
+                    if logger:
+                        logger.exception("Result sweeper failed")
+
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=run, name="result-sweeper", daemon=True)
+            self._sweeper.start()
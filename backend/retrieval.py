@@ -0,0 +1,92 @@
+import heapq
+import math
+import re
+from array import array
+from collections import Counter, defaultdict, deque
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+WORD_PATTERN = re.compile(rb"\S+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it its of on or that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def iter_chunk_spans(buffer, chunk_words=200, overlap=40):
+    # Overlapping chunks of chunk_words words over UTF-8 bytes or an mmap,
+    # yielding the (start, end) byte span of each chunk instead of its text;
+    # only one chunk's word offsets are held at a time
+    step = max(1, chunk_words - overlap)
+    window = deque()
+    # Chunks must start more than `overlap` words before the end. With an overlap
+    # of chunk_words or more, that's only known once enough words follow the chunk.
+    ready = deque()  # (start, end, words read) of full chunks waiting on that
+    first = True
+    count = 0
+    for match in WORD_PATTERN.finditer(buffer):
+        window.append(match.span())
+        count += 1
+        if len(window) == chunk_words:
+            ready.append((window[0][0], window[-1][1], count))
+            for _ in range(min(step, len(window))):
+                window.popleft()
+        while ready and count - ready[0][2] > overlap - chunk_words:
+            yield ready.popleft()[:2]
+            first = False
+    if ready:
+        if first:
+            yield ready[0][:2]  # The first chunk is kept however short the document
+    # A short tail is only a chunk of its own if it has more than the overlap
+    elif window and (first or len(window) > overlap):
+        yield window[0][0], window[-1][1]
+
+
+def span_text(text, span):
+    # A chunk's words, joined by single spaces
+    return " ".join(text.read(*span).split())
+
+
+def search_chunks(queries, chunks, k=3, k1=1.5, b=0.75):
+    # The k best BM25 chunk ids for every query, without an inverted index.
+    # chunks is called twice: once for chunk lengths and the document frequency
+    # of the query terms, once to score each chunk against the queries sharing a
+    # term with it. Memory follows the queries, not the document.
+    query_terms = [list(dict.fromkeys(tokenize(query))) for query in queries]
+    queries_by_term = defaultdict(list)
+    for query_id, terms in enumerate(query_terms):
+        for term in terms:
+            queries_by_term[term].append(query_id)
+
+    lengths = array("I")
+    document_frequency = dict.fromkeys(queries_by_term, 0)
+    for chunk in chunks():
+        terms = tokenize(chunk)
+        lengths.append(len(terms))
+        for term in set(terms).intersection(document_frequency):
+            document_frequency[term] += 1
+    avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+    idf = {term: math.log(1 + (len(lengths) - df + 0.5) / (df + 0.5))
+           for term, df in document_frequency.items() if df}
+
+    # Heaps of (score, -chunk_id) keep each query's k best chunks, ties going to the lower id
+    best = [[] for _ in queries]
+    for chunk_id, chunk in enumerate(chunks()):
+        terms = Counter(tokenize(chunk))
+        matching = {query_id for term in terms if term in idf for query_id in queries_by_term[term]}
+        norm = k1 * (1 - b + b * lengths[chunk_id] / (avg_length or 1))
+        for query_id in matching:
+            # dict.fromkeys order, not a set's, so scores sum the same way in every worker
+            score = 0.0
+            for term in query_terms[query_id]:
+                tf = terms.get(term)
+                if tf:
+                    score += idf[term] * tf * (k1 + 1) / (tf + norm)
+            if len(best[query_id]) < k:
+                heapq.heappush(best[query_id], (score, -chunk_id))
+            elif k:
+                heapq.heappushpop(best[query_id], (score, -chunk_id))
+    return [[-negated for _, negated in sorted(heap, reverse=True)] for heap in best]
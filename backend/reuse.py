@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import dedupe
+
+# Questions about the uploaded document itself; their answers depend on it, and
+# reusing one would hand another tenant content derived from this upload
+DOCUMENT_REFERENCE = re.compile(
+    r"\b(?:passage|text|above|below|according|author|writer|narrator|speaker|excerpt|extract|article|"
+    r"document|paragraph|story|poem|essay|stanza|chapter|section|lines?|figure|fig|table|chart|graph|"
+    r"diagram|image|picture)s?\b",
+    re.IGNORECASE,
+)
+
+
+def refers_to_document(question):
+    return DOCUMENT_REFERENCE.search(question) is not None
+
+
+def _band_id(key):
+    # LSH bucket key folded into a signed 64-bit SQLite integer
+    band, rows = key
+    digest = hashlib.blake2b(f"{band}:{','.join(map(str, rows))}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class ReuseIndex:
+    # Answers to previously asked questions, found again by MinHash/LSH
+    # similarity regardless of the document they came from. Shared by every
+    # gunicorn worker through SQLite; bounded by row count and age.
+    def __init__(self, path, threshold=0.95, max_items=100000, ttl=30 * 24 * 3600):
+        self.path = path
+        self.threshold = threshold
+        self.max_items = max_items
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "stored": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "id INTEGER PRIMARY KEY, normalized TEXT NOT NULL UNIQUE, answer TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, question_id INTEGER NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_band ON bands (band)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_question ON bands (question_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS questions_accessed ON questions (accessed)")
+
+    def _connect(self):
+        # sqlite3 connections can't cross threads or forks, so keep one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def lookup(self, questions):
+        # Returns the stored answer for each question, or None where nothing
+        # similar enough has been answered before or the question is about the document
+        conn = self._connect()
+        now = time.time()
+        answers = []
+        skipped = 0
+        for question in questions:
+            if refers_to_document(question):
+                answers.append(None)
+                skipped += 1
+                continue
+            normalized = dedupe.normalize(question)
+            question_shingles = dedupe.shingles(normalized)
+            numbers = dedupe.NUMBER_PATTERN.findall(normalized)
+            markers = dedupe.polarity(normalized)
+            words = dedupe.content_words(normalized)
+            bands = [_band_id(key) for key in dedupe.lsh_keys(dedupe.minhash(question_shingles))]
+            rows = conn.execute(
+                "SELECT DISTINCT q.id, q.normalized, q.answer FROM bands b JOIN questions q ON q.id = b.question_id "
+                f"WHERE b.band IN ({','.join('?' * len(bands))}) AND q.created >= ?",
+                (*bands, now - self.ttl),
+            ).fetchall()
+
+            best, best_similarity = None, self.threshold
+            for question_id, candidate, answer in rows:
+                if (dedupe.NUMBER_PATTERN.findall(candidate) != numbers or dedupe.polarity(candidate) != markers
+                        or dedupe.content_words(candidate) != words):
+                    continue
+                similarity = dedupe.jaccard(question_shingles, dedupe.shingles(candidate))
+                if similarity >= best_similarity:
+                    best, best_similarity = (question_id, answer), similarity
+
+            if best is None:
+                answers.append(None)
+                continue
+            conn.execute("UPDATE questions SET accessed = ? WHERE id = ?", (now, best[0]))
+            answers.append(best[1])
+        hits = sum(answer is not None for answer in answers)
+        self._count("hits", hits)
+        self._count("misses", len(answers) - hits - skipped)
+        self._count("skipped", skipped)
+        return answers
+
+    def store(self, questions, answers):
+        kept = [(question, answer) for question, answer in zip(questions, answers) if not refers_to_document(question)]
+        questions = [question for question, _ in kept]
+        answers = [answer for _, answer in kept]
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for question, answer in zip(questions, answers):
+                normalized = dedupe.normalize(question)
+                row = conn.execute("SELECT id FROM questions WHERE normalized = ?", (normalized,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE questions SET answer = ?, created = ?, accessed = ? WHERE id = ?",
+                                 (answer, now, now, row[0]))
+                    continue
+                question_id = conn.execute(
+                    "INSERT INTO questions (normalized, answer, created, accessed) VALUES (?, ?, ?, ?)",
+                    (normalized, answer, now, now),
+                ).lastrowid
+                signature = dedupe.minhash(dedupe.shingles(normalized))
+                conn.executemany("INSERT INTO bands (band, question_id) VALUES (?, ?)",
+                                 [(_band_id(key), question_id) for key in dedupe.lsh_keys(signature)])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("stored", len(questions))
+        with self._lock:
+            self._writes += len(questions)
+            sweep = self._writes >= 1000
+            if sweep:
+                self._writes = 0
+        if sweep:
+            self.evict()
+
+    def evict(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale = [row[0] for row in conn.execute(
+                "SELECT id FROM questions WHERE created < ?", (time.time() - self.ttl,))]
+            overflow = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0] - len(stale) - self.max_items
+            if overflow > 0:
+                stale += [row[0] for row in conn.execute(
+                    "SELECT id FROM questions WHERE created >= ? ORDER BY accessed LIMIT ?",
+                    (time.time() - self.ttl, overflow))]
+            for start in range(0, len(stale), 500):
+                ids = stale[start:start + 500]
+                placeholders = ",".join("?" * len(ids))
+                conn.execute(f"DELETE FROM bands WHERE question_id IN ({placeholders})", ids)
+                conn.execute(f"DELETE FROM questions WHERE id IN ({placeholders})", ids)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("evictions", len(stale))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["items"] = self._connect().execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        stats["pid"] = os.getpid()
+        return stats
@@ -0,0 +1,100 @@
+import heapq
+import mmap
+import os
+import re
+
+# A question ends at "?", along with any closing quotes or brackets right after it,
+# unless more URL/query text follows, or starts at a numbered item at the start of
+# a line: "1.", "2)", "(3)", "Q4)", "Q.5", "(a)", "b)". Each scanner starts with a
+# literal character so re can skip ahead to it; a single alternation of the two
+# is ~10x slower on large inputs.
+END_PATTERN = r"\?[\"')\]]*(?!\S)"
+MARKER_PATTERN = r"[ \t]*(?:\(?\d{1,3}[.)]|Q\.?\s?\d{1,3}[.):]?|\(?[a-z]\))(?=\s)"
+
+
+def _compile(pattern):
+    return re.compile(pattern), re.compile(pattern.encode("ascii"))
+
+
+END_SCANNER = _compile(END_PATTERN)
+LINE_MARKER_SCANNER = _compile(r"\n" + MARKER_PATTERN)
+FIRST_MARKER = _compile(MARKER_PATTERN)
+NON_SPACE = _compile(r"\S")
+
+
+def _boundaries(buffer, kind):
+    # (offset, is_marker) for every question boundary, in offset order
+    first = FIRST_MARKER[kind].match(buffer)
+    if first:
+        yield 0, True
+    markers = ((match.start() + 1, True) for match in LINE_MARKER_SCANNER[kind].finditer(buffer))
+    ends = ((match.end(), False) for match in END_SCANNER[kind].finditer(buffer))
+    yield from heapq.merge(markers, ends)
+
+
+def _trim(buffer, start, end, non_space):
+    # Narrow a span to its first and last non-whitespace characters
+    match = non_space.search(buffer, start, end)
+    if match is None:
+        return None
+    start = match.start()
+    while end > start and buffer[end - 1:end].isspace():
+        end -= 1
+    return start, end
+
+
+def iter_question_spans(buffer):
+    # One pass over a str, bytes or mmap, yielding (start, end) offsets of each
+    # question. Offsets are characters for str and bytes otherwise; markers and
+    # "?" are ASCII, so scanning UTF-8 bytes never lands inside a character.
+    # Text that is neither numbered nor ends in "?" (headings, instructions,
+    # trailing notes) is not a question and is skipped.
+    kind = 0 if isinstance(buffer, str) else 1
+    non_space = NON_SPACE[kind]
+
+    start = 0
+    numbered = False
+    for offset, is_marker in _boundaries(buffer, kind):
+        if is_marker:
+            if numbered:
+                span = _trim(buffer, start, offset, non_space)
+                if span:
+                    yield span
+            numbered = True
+        else:
+            span = _trim(buffer, start, offset, non_space)
+            if span:
+                yield span
+            numbered = False
+        start = offset
+
+    if numbered:
+        span = _trim(buffer, start, len(buffer), non_space)
+        if span:
+            yield span
+
+
+def strip_numbering(question):
+    match = FIRST_MARKER[0].match(question)
+    return question[match.end():].lstrip() if match else question
+
+
+def question_text(buffer, span):
+    text = buffer[span[0]:span[1]]
+    if not isinstance(text, str):
+        text = text.decode("utf-8", errors="replace")
+    return " ".join(text.split())
+
+
+def split_questions(text):
+    return [question_text(text, span) for span in iter_question_spans(text)]
+
+
+def split_questions_in_file(source):
+    # source is a path or a binary file object backed by a real file. The file
+    # is mapped rather than read, so only the question spans are ever decoded.
+    with (open(source, "rb") if isinstance(source, str) else open(os.dup(source.fileno()), "rb")) as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return [question_text(buffer, span) for span in iter_question_spans(buffer)]
@@ -1,2 +1,2 @@
 #!/bin/bash
-exec gunicorn --bind 0.0.0.0:$PORT --workers 2 --timeout 120 wsgi:app
\ No newline at end of file
+exec gunicorn --bind 0.0.0.0:$PORT --workers 2 --worker-class gthread --threads 8 --timeout 120 wsgi:app
\ No newline at end of file
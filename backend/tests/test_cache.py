@@ -0,0 +1,16 @@
+from cache import TieredCache, answer_key
+
+
+def test_answer_key_is_per_question():
+    assert answer_key("What is  ATP?", "ctx") == answer_key("what is atp?", "ctx")
+    assert answer_key("What is ATP?", "ctx") != answer_key("What is ADP?", "ctx")
+    assert answer_key("What is ATP?", "ctx") != answer_key("What is ATP?", "other")
+
+
+def test_set_many_is_shared_through_disk(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    writer = TieredCache(path, memory_items=1)
+    writer.set_many([("a", "first"), ("b", "second")])
+    writer.set("c", "third")
+    reader = TieredCache(path)
+    assert [reader.get(key) for key in "abcd"] == ["first", "second", "third", None]
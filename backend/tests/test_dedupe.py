@@ -0,0 +1,81 @@
+import pytest
+
+import dedupe
+
+HEIGHT = ("A seedling is grown for six weeks in full sunlight with regular watering; "
+          "which of the following statements about its expected height is ")
+
+
+@pytest.mark.parametrize("first, second", [
+    (HEIGHT + "true?", HEIGHT + "not true?"),
+    (HEIGHT + "true?", HEIGHT + "false?"),
+    (HEIGHT + "correct?", HEIGHT + "incorrect?"),
+    ("Which of the following statements about photosynthesis in green plants is true?",
+     "Which of the following statements about photosynthesis in green plants isn't true?"),
+    ("Which of the following is the most common cause of soil erosion in river valleys?",
+     "Which of the following is the least common cause of soil erosion in river valleys?"),
+    ("All of the following are functions of the liver in adult mammals, which one?",
+     "All of the following are functions of the liver in adult mammals except which one?"),
+])
+def test_negated_questions_stay_apart(first, second):
+    representatives, positions = dedupe.collapse([first, second], 0.9)
+    assert representatives == [0, 1]
+    assert positions == [0, 1]
+
+
+def test_negated_pair_is_similar_enough_to_have_merged():
+    # Guards the test above: without the polarity check these would collapse
+    first, second = dedupe.normalize(HEIGHT + "true?"), dedupe.normalize(HEIGHT + "not true?")
+    assert dedupe.jaccard(dedupe.shingles(first), dedupe.shingles(second)) >= 0.9
+
+
+def test_near_duplicates_still_collapse():
+    questions = [
+        "1. " + HEIGHT + "not true?",
+        "Q7) " + HEIGHT.upper() + "NOT TRUE",
+        "2. " + HEIGHT + "not  true ?",
+        HEIGHT + "true?",
+    ]
+    assert dedupe.collapse(questions, 0.9) == ([0, 3], [0, 0, 0, 1])
+
+
+def test_numbers_must_match():
+    assert dedupe.collapse(["What is 2 + 3?", "What is 2 + 4?"], 0.5)[0] == [0, 1]
+
+
+def test_polarity_treats_contractions_as_not():
+    assert dedupe.polarity(dedupe.normalize("Which is not correct?")) == \
+        dedupe.polarity(dedupe.normalize("Which isn't correct?")) == ["correct", "not"]
+
+
+ENERGY = ("During cellular respiration in the mitochondria of eukaryotic cells, which enzyme complex "
+          "is chiefly responsible for the production of {} from its precursor molecules?")
+CITY = ("Using the census table for the region described in the introduction, estimate the "
+        "change in population of city {} between the two most recent census years.")
+
+
+@pytest.mark.parametrize("first, second", [
+    (ENERGY.format("ATP"), ENERGY.format("ADP")),
+    (CITY.format("A"), CITY.format("B")),
+    (HEIGHT.replace("seedling", "sapling") + "true?", HEIGHT + "true?"),
+])
+def test_single_word_swaps_stay_apart(first, second):
+    normalized = dedupe.normalize(first), dedupe.normalize(second)
+    assert dedupe.jaccard(*map(dedupe.shingles, normalized)) >= 0.9
+    assert dedupe.collapse([first, second], 0.9) == ([0, 1], [0, 1])
+
+
+def test_stopword_and_contraction_variants_collapse():
+    questions = [
+        HEIGHT + "not true?",
+        HEIGHT.replace("is grown", "was grown") + "not true?",
+        HEIGHT + "isn't true?",
+    ]
+    assert dedupe.collapse(questions, 0.9) == ([0], [0, 0, 0])
+
+
+def test_content_words_read_contractions_as_not():
+    assert dedupe.content_words(dedupe.normalize("Why isn't the sky green?")) == \
+        dedupe.content_words(dedupe.normalize("Why is not the sky green?")) == {"sky", "green", "not"}
+    assert dedupe.content_words(dedupe.normalize("Why can't birds swim?")) == \
+        dedupe.content_words(dedupe.normalize("Why cannot birds swim?")) == {"birds", "swim", "not"}
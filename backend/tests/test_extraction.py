@@ -0,0 +1,31 @@
+import pytest
+
+docx = pytest.importorskip("docx")
+pytest.importorskip("PyPDF2")
+
+from extraction import iter_docx_paragraphs  # noqa: E402
+
+
+def test_docx_paragraphs_match_python_docx(tmp_path):
+    from docx.enum.text import WD_BREAK
+    from docx.oxml.ns import qn
+    from docx.shared import Inches
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document()
+    numbered = document.add_paragraph("1. What is X?")
+    numbered.paragraph_format.tab_stops.add_tab_stop(Inches(1.5))  # A w:tab in w:pPr/w:tabs
+    document.add_paragraph("2.\tWhat is Y?\nSecond line")
+    page = document.add_paragraph("3. Before the page break")
+    page.add_run().add_break(WD_BREAK.PAGE)
+    page.add_run(" and after it?")
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "4. In a table?"
+    table.cell(0, 1).text = "Tab\tinside"
+    document.add_paragraph("")
+    path = tmp_path / "questions.docx"
+    document.save(path)
+
+    expected = [Paragraph(p, None).text for p in docx.Document(path).element.body.iter(qn("w:p"))]
+    assert list(iter_docx_paragraphs(str(path))) == [text for text in expected if text]
+    assert next(iter_docx_paragraphs(str(path))) == "1. What is X?"
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from jobs import JobQueue, JobStore
+
+
+def test_busy_once_every_worker_has_a_job(tmp_path):
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, max_workers=1, max_pending=5)
+    started, release = threading.Event(), threading.Event()
+
+    def job(job_id):
+        started.set()
+        release.wait(5)
+
+    assert not queue.busy()
+    job_id = store.create(filename="a.txt")["id"]
+    queue.submit(job_id, job)
+    started.wait(5)
+    try:
+        assert queue.busy()
+    finally:
+        release.set()
+        queue.shutdown(wait=True)
+    assert not queue.busy()
+
+
+def test_exclusive_job_runs_alone(tmp_path):
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, max_workers=3, max_pending=5)
+    lock = threading.Lock()
+    running, overlaps = set(), []
+    first_started, release_first = threading.Event(), threading.Event()
+
+    def job(job_id, name):
+        with lock:
+            running.add(name)
+            overlaps.append((name, frozenset(running)))
+        if name == "first":
+            first_started.set()
+            release_first.wait(5)
+        with lock:
+            running.discard(name)
+
+    ids = [store.create(filename=f"{name}.txt")["id"] for name in ("first", "profiled", "later")]
+    queue.submit(ids[0], job, "first")
+    first_started.wait(5)
+    queue.submit(ids[1], job, "profiled", exclusive=True)
+    deadline = time.time() + 5
+    while queue._exclusive == 0 and time.time() < deadline:
+        time.sleep(0.01)  # Until the exclusive job is waiting for its turn
+    queue.submit(ids[2], job, "later")
+    try:
+        assert store.get(ids[1])["status"] == "queued"  # Waiting for "first" to finish
+    finally:
+        release_first.set()
+        queue.shutdown(wait=True)
+    assert dict(overlaps)["profiled"] == {"profiled"}
+    assert [name for name, _ in overlaps] == ["first", "profiled", "later"]
+
+
+def test_checkpoint_keeps_answers_per_question(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.create(filename="a.txt")["id"]
+    store.save_batch(job_id, ["q1", "q2"], ["one", "two"])
+    with open(tmp_path / f"{job_id}.batches", "a", encoding="utf-8") as f:
+        f.write('{"key": "old batch", "answers": ["stale"]}\n{"keys": ["q3"], "ans')  # Old record, then a torn one
+    store.save_batch(job_id, ["q3"], ["three"])
+    assert store.load_batches(job_id) == {"q1": "one", "q2": "two", "q3": "three"}
+
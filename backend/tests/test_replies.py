@@ -0,0 +1,61 @@
+from replies import align_answers, parse_json_answers, read_answers
+
+
+def test_truncated_reply_keeps_only_complete_pairs():
+    content = '{"1": "Polymorphism lets one interface serve many types.", "2": "Encapsul'
+    assert parse_json_answers([1, 2], content) == ["polymorphism lets one interface serve many types.", None]
+
+
+def test_truncated_reply_never_falls_back_to_lines():
+    content = '{\n"1": "First answer",\n"2": "Second answer",\n"3": "Thi'
+    assert parse_json_answers([1, 2, 3], content) == ["first answer", "second answer", None]
+
+
+def test_truncated_reply_with_escapes_and_braces():
+    content = '{"1": "Use \\"quotes\\" and {braces}", "2": "cut \\'
+    assert parse_json_answers([1, 2], content) == ['use "quotes" and {braces}', None]
+
+
+def test_fenced_reply():
+    content = 'Here you go:\n```json\n{"1": "Yes", "2": "No"}\n```'
+    assert parse_json_answers([1, 2], content) == ["yes", "no"]
+
+
+def test_nested_reply():
+    content = '{"answers": {"1": "Yes", "2": ["Line one", "Line two"]}}'
+    assert parse_json_answers([1, 2], content) == ["yes", "line one\nline two"]
+
+
+def test_answer_objects_and_question_keys():
+    content = '{"Q1": {"answer": "Yes"}, "Q2": {"reasoning": "..."}, "Q3": 4}'
+    assert parse_json_answers([1, 2, 3], content) == ["yes", None, "4"]
+
+
+def test_numbers_and_booleans_are_answers():
+    content = '{"1": 4, "2": true, "3": -0.5, "4": {"answer": false}, "5": null}'
+    assert parse_json_answers([1, 2, 3, 4, 5], content) == ["4", "true", "-0.5", "false", None]
+
+
+def test_truncated_numbers_need_a_terminator():
+    content = '{"1": 4, "2": true, "3": 12'
+    assert parse_json_answers([1, 2, 3], content) == ["4", "true", None]
+
+
+def test_no_json_gives_no_answers():
+    assert parse_json_answers([1, 2], "1. Yes\n2. No") == [None, None]
+
+
+def test_align_answers_plain_text():
+    assert align_answers([4, 5], ["4. Yes", "more on four", "5) No"]) == ["Yes\nmore on four", "No"]
+    assert align_answers([1, 2], ["Yes", "No"]) == ["Yes", "No"]
+    assert align_answers([1, 2, 3], ["Yes"]) == ["Yes", None, None]
+
+
+def test_read_answers_keeps_line_fallback_without_json():
+    assert read_answers([1, 2], "1. Yes\n2. No") == ["yes", "no"]
+    assert read_answers([1, 2], "Yes\nNo", structured=False) == ["yes", "no"]
+
+
+def test_read_answers_never_aligns_truncated_json():
+    content = '{\n"1": "First answer",\n"2": "Sec'
+    assert read_answers([1, 2], content) == ["first answer", None]
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+import pytest
+
+from ratelimit import RateLimitTimeout, SharedRateLimiter
+from resilience import CircuitBreaker, UpstreamGuard
+
+
+class Response:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_guard(send, **kwargs):
+    breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=2, cooldown=60)
+    guard = UpstreamGuard(send, breaker, hedge_min_samples=5, **kwargs)
+    for _ in range(5):
+        guard.latency.add(0.02)
+    return guard
+
+
+def test_rate_limit_wait_does_not_trigger_hedge():
+    sends = []
+
+    def send(payload, acquired):
+        sends.append(payload)
+        time.sleep(0.2)  # Queued for a rate-limit slot
+        acquired()
+        time.sleep(0.01)
+        return Response()
+
+    guard = make_guard(send)
+    assert guard.call({}).status_code == 200
+    assert len(sends) == 1
+    assert guard.stats()["hedged"] == 0
+    assert max(guard.latency._samples) < 0.1
+
+
+def test_slow_request_after_slot_is_hedged():
+    calls = []
+    lock = threading.Lock()
+
+    def send(payload, acquired):
+        with lock:
+            calls.append(payload)
+            first = len(calls) == 1
+        acquired()
+        time.sleep(0.3 if first else 0.01)
+        return Response()
+
+    guard = make_guard(send)
+    assert guard.call({}).status_code == 200
+    assert guard.stats()["hedged"] == 1
+    assert guard.stats()["hedge_wins"] == 1
+
+
+@pytest.mark.parametrize("hedge_percentile", [None, 95])
+def test_post_chat_behind_guard(tmp_path, monkeypatch, hedge_percentile):
+    pytest.importorskip("requests")
+    import llm_client
+    from benchmarks.mock_llm import start_mock
+
+    server = start_mock(latency_median=0.01, latency_p99=0.02)
+    limiter = SharedRateLimiter(str(tmp_path / "ratelimit.json"), rate=100, burst=10)
+    monkeypatch.setattr(llm_client, "_settings", dict(llm_client._settings))
+    monkeypatch.setattr(llm_client, "_limiter", None)
+    llm_client.configure(url=f"http://127.0.0.1:{server.server_address[1]}/chat", limiter=limiter)
+    try:
+        guard = UpstreamGuard(llm_client.post_chat, CircuitBreaker(), hedge_percentile=hedge_percentile,
+                              hedge_min_samples=5)
+        for _ in range(5):
+            guard.latency.add(5.0)  # Far above the mock's latency, so no hedge is sent
+        response = guard.call({"messages": [{"role": "user", "content": "Questions:\n1. What is a cell?"}]})
+        assert response.status_code == 200
+        assert "1" in json.loads(response.json()["choices"][0]["message"]["content"])
+        assert server.chat.counts == {200: 1}
+        assert len(guard.latency._samples) == 6  # The request was timed from its slot
+        assert limiter.stats()["acquired"] == 1
+        assert guard.breaker.stats()["error_rate"] == 0.0
+    finally:
+        llm_client.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_rate_limit_timeout_is_not_a_breaker_failure():
+    def send(payload, acquired):
+        raise RateLimitTimeout("No upstream request slot within 60s")
+
+    guard = make_guard(send, hedge_percentile=None)
+    for _ in range(4):
+        with pytest.raises(RateLimitTimeout):
+            guard.call({})
+    assert guard.breaker.state() == "closed"
+    assert guard.breaker.stats()["error_rate"] == 0.0
+
+
+def open_breaker(breaker):
+    tickets = [breaker.allow() for _ in range(breaker.min_calls)]
+    for ticket in tickets:
+        breaker.record(ticket, False)
+    assert breaker.state() == "open"
+
+
+def test_only_the_trial_decides_a_half_open_breaker():
+    breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=2, cooldown=0.05)
+    straggler = breaker.allow()
+    open_breaker(breaker)
+    time.sleep(0.06)
+    trial = breaker.allow()
+    assert trial is not None
+    assert breaker.allow() is None
+
+    breaker.record(straggler, True)  # Sent before the breaker opened
+    assert breaker.state() == "half-open"
+    assert breaker.allow() is None
+
+    breaker.record(trial, True)
+    assert breaker.state() == "closed"
+
+
+def test_failed_straggler_keeps_the_trial_outstanding():
+    breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=2, cooldown=0.05)
+    straggler = breaker.allow()
+    open_breaker(breaker)
+    time.sleep(0.06)
+    trial = breaker.allow()
+
+    breaker.record(straggler, False)
+    assert breaker.allow() is None  # Still only one trial in flight
+
+    breaker.record(trial, False)
+    assert breaker.state() == "open"
+
+
+def test_trial_that_never_reached_upstream_frees_the_slot():
+    breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=2, cooldown=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    trial = breaker.allow()
+    breaker.record(trial, None)
+    assert breaker.allow() is not None
+
+
+def test_throttling_is_not_a_breaker_failure():
+    def send(payload, acquired):
+        acquired()
+        return Response(429)
+
+    guard = make_guard(send, hedge_percentile=None)
+    for _ in range(4):
+        assert guard.call({}).status_code == 429
+    assert guard.breaker.state() == "closed"
+    assert guard.breaker.stats()["error_rate"] == 0.0
+
+
+def test_server_errors_open_the_breaker():
+    def send(payload, acquired):
+        acquired()
+        return Response(503)
+
+    guard = make_guard(send, hedge_percentile=None)
+    for _ in range(2):
+        guard.call({})
+    assert guard.breaker.state() == "open"
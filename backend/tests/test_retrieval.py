@@ -0,0 +1,83 @@
+import math
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from retrieval import iter_chunk_spans, search_chunks, span_text, tokenize
+from textspool import TextSpool
+
+WORDS = ("photosynthesis chlorophyll light energy glucose oxygen carbon dioxide water leaf root "
+         "cell membrane nucleus protein enzyme reaction rate temperature the of and what is "
+         "how does why 1998 42 élan café naïve").split()
+
+
+def chunk_text(text, chunk_words=200, overlap=40):
+    # The in-memory chunker iter_chunk_spans replaced
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, chunk_words - overlap)
+    return [" ".join(words[start:start + chunk_words])
+            for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+class BM25Index:
+    # The inverted index search_chunks replaced, kept to check it ranks the same
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for chunk_id, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings[term].append((chunk_id, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (len(chunks) - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query, k=3):
+        scores = defaultdict(float)
+        for term in dict.fromkeys(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / (self.avg_length or 1))
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores, key=lambda chunk_id: (-scores[chunk_id], chunk_id))[:k]
+
+
+def random_text(rng, words):
+    separators = [" ", " ", " ", "\n", "  ", "\t"]
+    return "".join(rng.choice(WORDS) + rng.choice(separators) for _ in range(words)).strip()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_chunk_spans_match_chunk_text(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randint(0, 900))
+    chunk_words = rng.choice([5, 50, 200])
+    overlap = rng.choice([0, 2, 40])
+    spool = TextSpool()
+    try:
+        spool.extend([text])
+        with spool.buffer() as buffer:
+            spans = list(iter_chunk_spans(buffer, chunk_words, overlap))
+        assert [span_text(spool, span) for span in spans] == chunk_text(text, chunk_words, overlap)
+    finally:
+        spool.close()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_search_chunks_matches_bm25_index(seed):
+    rng = random.Random(seed)
+    chunks = [random_text(rng, rng.randint(1, 60)) for _ in range(rng.randint(1, 40))]
+    queries = [random_text(rng, rng.randint(1, 8)) for _ in range(20)] + ["", "zebra"]
+    k = rng.choice([1, 3, 5])
+    index = BM25Index(chunks)
+    assert search_chunks(queries, lambda: iter(chunks), k) == [index.search(query, k) for query in queries]
@@ -0,0 +1,43 @@
+import pytest
+
+from reuse import ReuseIndex, refers_to_document
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ReuseIndex(str(tmp_path / "reuse.sqlite3"), threshold=0.95)
+
+
+@pytest.mark.parametrize("question", [
+    "What is the main idea of the passage?",
+    "Summarise the text above.",
+    "According to the author, why did the experiment fail?",
+    "What does Figure 2 show?",
+    "Which value in Table 3 is the largest?",
+    "What does the narrator feel in lines 10-14?",
+])
+def test_document_questions_are_neither_stored_nor_reused(index, question):
+    assert refers_to_document(question)
+    index.store([question], ["An answer about one tenant's upload"])
+    assert index.lookup([question]) == [None]
+    assert index.stats()["stored"] == 0
+
+
+def test_standalone_questions_are_reused(index):
+    index.store(["What is the capital of France?"], ["Paris"])
+    assert index.lookup(["what is the capital of France"]) == ["Paris"]
+    assert index.lookup(["What is the capital of Spain?"]) == [None]
+
+
+def test_negated_question_does_not_reuse_answer(index):
+    question = "Which of the following statements about the boiling point of water at sea level is true?"
+    index.store([question], ["It is 100 degrees Celsius"])
+    assert index.lookup([question.replace("is true", "is not true")]) == [None]
+
+
+def test_single_word_swap_is_not_reused(tmp_path):
+    index = ReuseIndex(str(tmp_path / "reuse.sqlite3"), threshold=0.9)
+    question = ("During cellular respiration in the mitochondria of eukaryotic cells, which enzyme complex "
+                "is chiefly responsible for the production of {} from its precursor molecules?")
+    index.store([question.format("ATP")], ["ATP synthase"])
+    assert index.lookup([question.format("ADP"), question.format("ATP")]) == [None, "ATP synthase"]
@@ -0,0 +1,68 @@
+import pytest
+
+from segmenter import split_questions, split_questions_in_file, strip_numbering
+
+
+def split_both(tmp_path, text):
+    # The str scanner and the bytes one behind split_questions_in_file must agree
+    path = tmp_path / "text.txt"
+    path.write_bytes(text.encode("utf-8"))
+    questions = split_questions(text)
+    assert split_questions_in_file(str(path)) == questions
+    return questions
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Is it true?"\nNext?', ['Is it true?"', "Next?"]),
+    ("Is it 'fair?'\nWhy not?", ["Is it 'fair?'", "Why not?"]),
+    ("(Which one?) Explain why?", ["(Which one?)", "Explain why?"]),
+    ('[Is "it" done?"] Then?', ['[Is "it" done?"]', "Then?"]),
+    ('Asked "why?")', ['Asked "why?")']),
+])
+def test_closing_quotes_and_brackets_stay_with_their_question(tmp_path, text, expected):
+    assert split_both(tmp_path, text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("What does https://example.com/search?q=cells&page=2 return?", None),
+    ("Open example.com/?id=1 and say why?", None),
+    ("Is http://example.com/? the root?", ["Is http://example.com/?", "the root?"]),
+])
+def test_urls_do_not_end_questions(tmp_path, text, expected):
+    assert split_both(tmp_path, text) == (expected or [text])
+
+
+def test_numbered_markers(tmp_path):
+    text = ("Answer every question.\n"
+            "1. Name a gas\n"
+            "2) Name a metal\n"
+            "(3) Name a salt\n"
+            "Q4) Name an acid\n"
+            "Q.5 Name a base\n"
+            "(a) Name a noble gas\n"
+            "b) Name a halogen\n")
+    assert split_both(tmp_path, text) == [
+        "1. Name a gas", "2) Name a metal", "(3) Name a salt", "Q4) Name an acid",
+        "Q.5 Name a base", "(a) Name a noble gas", "b) Name a halogen",
+    ]
+
+
+def test_markers_only_count_at_line_start(tmp_path):
+    assert split_both(tmp_path, "1. Compare 2. and 3) in the text\n2. Why?") == \
+        ["1. Compare 2. and 3) in the text", "2. Why?"]
+
+
+def test_question_runs_over_lines_and_unicode(tmp_path):
+    assert split_both(tmp_path, "1. Où est\n   le café « noir »?\n2. Encore ?") == \
+        ["1. Où est le café « noir »?", "2. Encore ?"]
+
+
+def test_text_without_questions(tmp_path):
+    assert split_both(tmp_path, "Instructions: read carefully.\n\nNotes at the end.") == []
+    assert split_both(tmp_path, "") == []
+
+
+def test_strip_numbering():
+    assert strip_numbering("Q.5 Name a base") == "Name a base"
+    assert strip_numbering("(a)  Name a noble gas") == "Name a noble gas"
+    assert strip_numbering("Name a gas") == "Name a gas"
@@ -0,0 +1,81 @@
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+NO_TEXT = "No extractable text found"
+
+
+class TextSpool:
+    # A document's extracted text as UTF-8, in memory up to max_size bytes and
+    # in a temporary file beyond that, or read straight from a saved text file.
+    # Later stages scan it through buffer() and slice it by byte offset, so
+    # the whole document never has to exist as one str.
+    def __init__(self, max_size=32 * 1024 * 1024, path=None):
+        if path is None:
+            self._file = tempfile.SpooledTemporaryFile(max_size=max_size, mode="w+b")
+        else:
+            self._file = open(path, "rb")
+        self.size = self._file.seek(0, os.SEEK_END)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        return cls(path=path)
+
+    def extend(self, pieces):
+        # Writes the concatenation of pieces with leading and trailing whitespace
+        # dropped, like "".join(pieces).strip() but without building the string
+        self._file.seek(self.size)
+        started = False
+        held = ""  # Whitespace that only gets written if more text follows it
+        for piece in pieces:
+            if not started:
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+                started = True
+            stripped = piece.rstrip()
+            if stripped:
+                self._write(held + stripped)
+                held = piece[len(stripped):]
+            else:
+                held += piece
+        if not started:
+            self._write(NO_TEXT)
+
+    def _write(self, text):
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self.size += len(data)
+
+    @contextmanager
+    def buffer(self):
+        # bytes while the text is small enough to stay in memory, an mmap of the file otherwise
+        self._file.flush()
+        raw = getattr(self._file, "_file", self._file)
+        if isinstance(raw, io.BytesIO) or self.size == 0:
+            yield raw.getvalue() if isinstance(raw, io.BytesIO) else b""
+            return
+        with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+    def read(self, start=0, end=None):
+        end = self.size if end is None else end
+        with self._lock:
+            self._file.seek(start)
+            return self._file.read(end - start).decode("utf-8", errors="replace")
+
+    def save(self, path):
+        # Write-then-rename so another worker never opens half a file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock, open(tmp_path, "wb") as f:
+            self._file.seek(0)
+            shutil.copyfileobj(self._file, f, 1024 * 1024)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        self._file.close()